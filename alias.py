@@ -0,0 +1,45 @@
+"""Vose alias tables: constant time sampling from a fixed distribution."""
+import random
+import numpy
+
+def make_table(entry):
+  """Alias table for sampling from a {symbol: weight} dictionary."""
+  symbols = sorted(entry)
+  count = len(symbols)
+  total = float(sum(entry.values()))
+  scaled = [entry[symbol] * count / total for symbol in symbols]
+  probability = [1.0] * count
+  alias = range(count)
+  small = [i for i in xrange(count) if scaled[i] < 1.0]
+  large = [i for i in xrange(count) if scaled[i] >= 1.0]
+  while small and large:
+    less = small.pop()
+    more = large.pop()
+    probability[less] = scaled[less]
+    alias[less] = more
+    scaled[more] -= 1.0 - scaled[less]
+    if scaled[more] < 1.0:
+      small.append(more)
+    else:
+      large.append(more)
+  # Anything left over is 1.0, give or take rounding
+  return [symbols, probability, alias]
+
+def sample(table, rng=random):
+  """One symbol drawn from a table made by make_table."""
+  symbols, probability, alias = table
+  position = rng.random() * len(symbols)
+  column = int(position)
+  if position - column >= probability[column]:
+    column = alias[column]
+  return symbols[column]
+
+def sample_many(arrays, size, random_state):
+  """Array of size symbols drawn from a make_table table whose columns
+  are NumPy arrays, using a NumPy RandomState."""
+  symbols, probability, alias = arrays
+  position = random_state.random_sample(size) * len(symbols)
+  column = position.astype(numpy.int64)
+  use_alias = position - column >= probability[column]
+  column[use_alias] = alias[column[use_alias]]
+  return symbols[column]
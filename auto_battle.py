@@ -0,0 +1,35 @@
+"""Policies choosing each action when GameState.auto_battle fights."""
+import items
+
+HEALING_ITEMS = (items.MinorHealthPotion, items.HealthPotion,
+                 items.MajorHealthPotion, items.SuperHealthPotion)
+
+class AutoBattlePolicy(object):
+  """Attacks, unless a skill or healing item should be used first.
+
+  skills: names of skills to use, in order of priority, whenever they can
+    be used (enough SP, and once per battle skills not used yet).
+  heal_below: drink a health potion before acting while HP is below this
+    fraction of max HP. 0 never uses items.
+  """
+  def __init__(self, skills=(), heal_below=0.0):
+    self.skills = list(skills)
+    self.heal_below = heal_below
+
+  def choose(self, game_state):
+    """Returns ("Item", index), ("Skill", name) or ("Attack", None)."""
+    character = game_state.character
+    if character.current_hp < self.heal_below * character.max_hp:
+      for index, item in enumerate(character.items):
+        if isinstance(item, HEALING_ITEMS):
+          return ("Item", index)
+    if self.skills:
+      available = game_state.use_skill_choices()
+      for name in self.skills:
+        if name in available:
+          return ("Skill", name)
+    return ("Attack", None)
+
+ATTACK_ONLY = AutoBattlePolicy()
+# Used by the Auto Battle button
+DEFAULT = AutoBattlePolicy(heal_below=0.25)
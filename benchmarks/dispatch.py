@@ -0,0 +1,77 @@
+"""Per-choice dispatch overhead: name-built getattr lookups against tables.
+
+The "getattr" rows are how GameState.apply_choice and Combat.perform_action
+used to find their method ("apply_choice_" + state.lower(), "action_" +
+action.lower()). The "table" rows are the current TRANSITIONS and ACTIONS
+lookups. States and actions come from seeded random games, so the mix is
+realistic. get_choices is timed on sampled games.
+
+Run from the repository root: python -m benchmarks.dispatch
+"""
+# pylint: disable=print-statement
+import argparse
+import timeit
+import simulation
+import snapshot
+from combat import Combat, ACTIONS
+from game_state import GameState, TRANSITIONS
+
+def record_game(seed, choices):
+  """Plays a random game, returning the state before each choice and
+  snapshots of the game at every 50th choice."""
+  policy = simulation.RandomPolicy(seed)
+  game_state = GameState(seed)
+  states = []
+  samples = []
+  for i in xrange(choices):
+    states.append(game_state.current_state())
+    if i % 50 == 0:
+      samples.append(snapshot.dumps(game_state))
+    game_state.apply_choice(policy.choose(game_state, game_state.get_choices()))
+  return states, [snapshot.loads(sample) for sample in samples]
+
+def getattr_transitions(states):
+  for state in states:
+    getattr(GameState, "apply_choice_" + state.lower(), None)
+
+def table_transitions(states):
+  for state in states:
+    TRANSITIONS.get(state)
+
+def getattr_actions(actions):
+  for action in actions:
+    getattr(Combat, "action_" + action.lower())
+
+def table_actions(actions):
+  for action in actions:
+    ACTIONS.get(action)
+
+def get_choices(games):
+  for game_state in games:
+    game_state.get_choices()
+
+def time_per_call(function, values, repeat):
+  seconds = min(timeit.repeat(lambda: function(values), number=1,
+                              repeat=repeat))
+  return seconds / len(values) * 1e9
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--choices", type=int, default=20000)
+  parser.add_argument("--repeat", type=int, default=20)
+  args = parser.parse_args()
+  states, games = record_game(args.seed, args.choices)
+  # Every character attack is followed by at least one monster attack
+  actions = ["Attack"] * 8 + ["Skill", "Escape"]
+  rows = [("apply_choice getattr", getattr_transitions, states),
+          ("apply_choice table", table_transitions, states),
+          ("perform_action getattr", getattr_actions, actions * 1000),
+          ("perform_action table", table_actions, actions * 1000),
+          ("get_choices", get_choices, games * 20)]
+  for name, function, values in rows:
+    print "%-24s %7.1f ns/call" % (name, time_per_call(function, values,
+                                                         args.repeat))
+
+if __name__ == "__main__":
+  main()
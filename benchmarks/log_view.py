@@ -0,0 +1,125 @@
+"""Cost of writing log lines to the game's wx text panels.
+
+Writes --lines log lines, taken from seeded climber games, to:
+  old rich text:       write_color_text as it was: a BeginTextColour for
+                       every segment and never an EndTextColour, paragraph
+                       spacing pushed and a scroll on every write
+  rich text per line:  the current write_color_text, once per line
+  rich text per choice: the current write_color_text, once per choice
+  log panel:           LogPanel.add_entry, once per line
+  log panel per choice: LogPanel.add_entries, once per choice
+Times include the final redraw. The rich text rows never trim the control,
+as the old LogPanel did, so they show how cost grows with its length.
+
+Needs a display. Without one, run it under a virtual X server, from the
+repository root: xvfb-run -a python -m benchmarks.log_view
+"""
+# pylint: disable=print-statement
+import argparse
+import os
+import tempfile
+import time
+import wx
+import wx.richtext
+import game_app
+import log_events
+import simulation
+from game_state import GameState
+
+def record_logs(seed, lines):
+  """Returns the log texts of each choice of seeded climber games, with at
+  least lines lines in all."""
+  batches = []
+  count = 0
+  while count < lines:
+    policy = simulation.ClimberPolicy(seed)
+    game_state = GameState(seed)
+    while count < lines and game_state.current_state() != "VICTORY":
+      choice = policy.choose(game_state, game_state.get_choices())
+      logs = log_events.texts(game_state.apply_choice(choice))
+      if logs:
+        batches.append(logs)
+        count += len(logs)
+    seed += 1
+  return batches
+
+def old_write_color_text(rtc, string):
+  """game_app.write_color_text before style runs."""
+  tokens = string.split("`")
+  rtc.SetInsertionPoint(rtc.GetLastPosition())
+  rtc.BeginTextColour((0, 0, 0))
+  rtc.BeginParagraphSpacing(0, 0)
+  rtc.WriteText(tokens.pop(0))
+  while tokens:
+    color_string = tokens.pop(0)
+    r, g, b = map(int, color_string.split(","))  # pylint: disable=invalid-name
+    rtc.BeginTextColour((r, g, b))
+    rtc.WriteText(tokens.pop(0))
+  rtc.ShowPosition(rtc.GetLastPosition())
+
+def time_rich_text(frame, write, batches, per_choice):
+  style = wx.TE_READONLY | wx.TE_MULTILINE | wx.BORDER
+  rtc = wx.richtext.RichTextCtrl(frame, value="", style=style)
+  rtc.SetSize(frame.GetClientSize())
+  start = time.time()
+  for batch in batches:
+    if per_choice:
+      write(rtc, "\n".join(batch) + "\n")
+    else:
+      for line in batch:
+        write(rtc, line + "\n")
+  rtc.Update()
+  wx.Yield()
+  elapsed = time.time() - start
+  rtc.Destroy()
+  return elapsed
+
+def time_log_panel(frame, batches, per_choice):
+  panel = game_app.LogPanel(frame)
+  panel.SetSize(frame.GetClientSize())
+  start = time.time()
+  for batch in batches:
+    if per_choice:
+      panel.add_entries(batch)
+    else:
+      for line in batch:
+        panel.add_entry(line)
+  panel.Update()
+  wx.Yield()
+  elapsed = time.time() - start
+  panel.log_writer.close()
+  panel.Destroy()
+  return elapsed
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+  parser.add_argument("--lines", type=int, default=10000)
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+  batches = record_logs(args.seed, args.lines)
+  lines = sum(len(batch) for batch in batches)
+  # LogPanel writes its log file to the current directory
+  os.chdir(tempfile.mkdtemp())
+  wx_app = wx.App(False)  # pylint: disable=unused-variable
+  frame = wx.Frame(None, title="log_view benchmark", size=(800, 600))
+  frame.Show()
+  rows = [("old rich text",
+           lambda: time_rich_text(frame, old_write_color_text, batches,
+                                  False)),
+          ("rich text per line",
+           lambda: time_rich_text(frame, game_app.write_color_text, batches,
+                                  False)),
+          ("rich text per choice",
+           lambda: time_rich_text(frame, game_app.write_color_text, batches,
+                                  True)),
+          ("log panel", lambda: time_log_panel(frame, batches, False)),
+          ("log panel per choice",
+           lambda: time_log_panel(frame, batches, True))]
+  print "%d lines in %d choices" % (lines, len(batches))
+  for name, function in rows:
+    elapsed = function()
+    print "%-22s %8.2fs %9.1f us/line" % (name, elapsed, 1e6 * elapsed / lines)
+  frame.Destroy()
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,66 @@
+"""Cost of creating a monster as its level grows.
+
+Monster stats are sums of level dice. The "loop" column is the old way of
+rolling them, one randint per die, timed only up to --loop-limit because it
+grows linearly. The other columns use dice.py, which should stay flat from
+level 1 to 10,000. Alias tables are built before timing; the time to build
+them is reported separately.
+
+Run from the repository root: python -m benchmarks.monster_creation
+"""
+# pylint: disable=print-statement
+import argparse
+import random
+import time
+import timeit
+import dice
+from monster import Monster, STAT_DICE
+from monster_batch import MonsterBatch
+
+LEVELS = [1, 10, 100, 1000, 10000]
+
+def loop_stats(level, rng):
+  """Monster.roll_stat before dice.py, for every stat."""
+  for die, modifier in STAT_DICE.itervalues():
+    sum(rng.randint(1, die) + modifier for _ in xrange(level))
+
+def dice_stats(level, rng):
+  for die, modifier in STAT_DICE.itervalues():
+    Monster.roll_stat(level, die, modifier, rng)
+
+def time_per_call(function, number, repeat):
+  return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+  parser.add_argument("--levels", type=int, nargs="+", default=LEVELS)
+  parser.add_argument("--loop-limit", type=int, default=1000)
+  parser.add_argument("--batch-size", type=int, default=10)
+  parser.add_argument("--repeat", type=int, default=5)
+  args = parser.parse_args()
+  rng = random.Random(0)
+  start = time.time()
+  for die in set(die for die, _ in STAT_DICE.itervalues()):
+    for level in xrange(1, dice.EXACT_LIMIT + 1):
+      dice.get_arrays(level, die)
+  print "Built alias tables up to level %d in %.2fs" % (dice.EXACT_LIMIT,
+                                                        time.time() - start)
+  print "%6s %14s %14s %14s %14s" % ("level", "loop stats", "dice stats",
+                                     "Monster()", "batch/monster")
+  for level in args.levels:
+    if level <= args.loop_limit:
+      loop = "%11.1f us" % (1e6 * time_per_call(
+          lambda: loop_stats(level, rng), max(1, 1000 // level), args.repeat))
+    else:
+      loop = "-"
+    stats = time_per_call(lambda: dice_stats(level, rng), 1000, args.repeat)
+    monster = time_per_call(lambda: Monster(level, False, rng), 200,
+                            args.repeat)
+    bosses = [False] * args.batch_size
+    batch = time_per_call(lambda: MonsterBatch(level, bosses, rng), 100,
+                          args.repeat) / args.batch_size
+    print "%6d %14s %11.1f us %11.1f us %11.1f us" % (
+        level, loop, 1e6 * stats, 1e6 * monster, 1e6 * batch)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,127 @@
+"""Checks and times the direct draws in Equipment.reforge and recycling.
+
+For each level, samples Equipment.split_gains and get_recycled_materials
+both with the one-at-a-time loop (loop_limit forced high) and with the
+direct draws (loop_limit forced to 0). For every part of the split and
+every material, it compares the two samples with a two-sample chi-square
+test of their distributions and a z-test of their means, printing both
+z-scores and per-call times. A chi-square z or a |mean z| above --z-limit
+(default 4) means the direct draws do not match the loop: the check
+fails, and the exit status is 1. When they do match, a run of the
+default 57 comparisons fails by chance well under 1% of the time.
+
+Run from the repository root: python -m benchmarks.sampling
+"""
+# pylint: disable=print-statement
+import argparse
+import collections
+import math
+import random
+import sys
+import time
+from equipment import Equipment, RARITY
+
+LEVELS = [50, 500, 5000]
+NEVER = 10 ** 9
+Z_LIMIT = 4.0
+# Parts a reforge splits its stat gains between
+PARTS = 4
+
+def chi_square_z(first, second):
+  """z-score of a two-sample chi-square test on two lists of values, high
+  when they differ. Sparse bins are merged into their neighbours."""
+  first_counts = collections.Counter(first)
+  second_counts = collections.Counter(second)
+  scale = math.sqrt(float(len(second)) / len(first))
+  statistic = 0.0
+  bins = 0
+  pending = [0, 0]
+  for value in sorted(set(first_counts) | set(second_counts)):
+    pending[0] += first_counts[value]
+    pending[1] += second_counts[value]
+    if pending[0] + pending[1] >= 20:
+      first_count, second_count = pending
+      statistic += ((first_count * scale - second_count / scale) ** 2 /
+                    (first_count + second_count))
+      bins += 1
+      pending = [0, 0]
+  degrees = max(1, bins - 1)
+  # Wilson-Hilferty: close to normal even with only a few bins
+  spread = 2.0 / (9 * degrees)
+  return (((statistic / degrees) ** (1 / 3.0) - (1 - spread)) /
+          math.sqrt(spread))
+
+def mean_z(first, second):
+  """z-score of the difference between the means of two lists of values."""
+  means = []
+  variance = 0.0
+  for values in (first, second):
+    mean = float(sum(values)) / len(values)
+    means.append(mean)
+    variance += (sum((value - mean) ** 2 for value in values) /
+                 (len(values) - 1) / len(values))
+  if not variance:
+    return 0.0
+  return (means[0] - means[1]) / math.sqrt(variance)
+
+def sample(function, samples):
+  start = time.time()
+  values = [function() for _ in xrange(samples)]
+  return values, (time.time() - start) / samples
+
+def compare(name, loop, direct, samples, columns, z_limit):
+  """Samples loop and direct, and tests each of the columns (name, index)
+  of their results. Returns the names of the columns that differ."""
+  loop_values, loop_time = sample(loop, samples)
+  direct_values, direct_time = sample(direct, samples)
+  print "  %-22s loop %9.1f us  direct %7.1f us" % (
+      name, 1e6 * loop_time, 1e6 * direct_time)
+  failures = []
+  for column, index in columns:
+    first = [value[index] for value in loop_values]
+    second = [value[index] for value in direct_values]
+    distribution = chi_square_z(first, second)
+    mean = mean_z(first, second)
+    failed = distribution > z_limit or abs(mean) > z_limit
+    print "    %-20s chi-square z %+5.2f  mean z %+5.2f%s" % (
+        column, distribution, mean, "  FAIL" if failed else "")
+    if failed:
+      failures.append("%s %s" % (name, column))
+  return failures
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+  parser.add_argument("--levels", type=int, nargs="+", default=LEVELS)
+  parser.add_argument("--samples", type=int, default=2000)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--z-limit", type=float, default=Z_LIMIT)
+  args = parser.parse_args()
+  rng = random.Random(args.seed)
+  failures = []
+  parts = [("part %d" % part, part) for part in xrange(PARTS)]
+  materials = [(RARITY[material], material)
+               for material in xrange(len(RARITY))]
+  for level in args.levels:
+    print "Level %d" % level
+    # A Rare item reforged up from half the level: 3 * level / 2 stat gains
+    gains = 3 * (level - level / 2)
+    failures += compare(
+        "split_gains",
+        lambda: Equipment.split_gains(gains, PARTS, rng, loop_limit=NEVER),
+        lambda: Equipment.split_gains(gains, PARTS, rng, loop_limit=0),
+        args.samples, parts, args.z_limit)
+    for rarity in (0, 2, 4):
+      item = Equipment(level, {}, 1, rarity)
+      failures += compare(
+          "recycle %s" % RARITY[rarity],
+          lambda: item.get_recycled_materials(rng, loop_limit=NEVER),
+          lambda: item.get_recycled_materials(rng, loop_limit=0),
+          args.samples, materials, args.z_limit)
+  if failures:
+    print "%d distribution(s) differ, z > %s: %s" % (
+        len(failures), args.z_limit, ", ".join(failures))
+    sys.exit(1)
+  print "All distributions match (z <= %s)" % args.z_limit
+
+if __name__ == "__main__":
+  main()
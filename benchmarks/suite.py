@@ -0,0 +1,172 @@
+"""Benchmark suite: times the game's hot paths against a stored baseline.
+
+Microbenchmarks time one call of Combat.perform_turn, Monster(),
+NameGenerator.generate_name, Equipment.get_new_armor,
+GameState.tower_update and GameState(). The macrobenchmark plays seeded
+games with simulation.ClimberPolicy. Everything is seeded, so two runs do
+the same work and only the time differs.
+
+Each benchmark reports the best of --repeat runs in microseconds per call,
+the least noisy figure. Results are written as JSON with --output, and
+compared against --baseline: any benchmark more than --threshold slower
+than its baseline is a regression, and the exit status is 1. Baselines
+only mean something on the machine that made them; refresh one with
+--save-baseline after changing machines or deliberately trading speed.
+
+Run from the repository root: python -m benchmarks.suite
+"""
+# pylint: disable=print-statement
+import argparse
+import collections
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+import log_events
+import simulation
+from combat import Combat
+from equipment import Equipment
+from game_state import GameState
+from monster import Monster, NAME_GENERATOR
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+THRESHOLD = 0.15
+SEED = 0
+MACRO_GAMES = 3
+MACRO_CHOICES = 2000
+
+def combat_turn(seed):
+  """A fight that never ends: both sides are healed whenever a turn ends
+  with anything but the character's next turn."""
+  game_state = GameState(seed)
+  game_state.apply_choice(0)   # Create the character, giving it a weapon
+  character = game_state.character
+  monster = Monster(1, False, game_state.rng)
+  logs = log_events.NullLog()
+  def turn():
+    if (Combat.perform_turn("Attack", None, character, monster, logs) !=
+        Combat.CHARACTER_TURN):
+      character.current_hp = character.max_hp
+      monster.current_hp = monster.max_hp
+  return turn
+
+def monster_init(seed):
+  rng = random.Random(seed)
+  return lambda: Monster(10, False, rng)
+
+def generate_name(seed):
+  rng = random.Random(seed)
+  return lambda: NAME_GENERATOR.generate_name(rng)
+
+def new_armor(seed):
+  rng = random.Random(seed)
+  return lambda: Equipment.get_new_armor(10, rarity=2, rng=rng)
+
+def tower_update(seed):
+  return GameState(seed).tower_update
+
+def game_state_init(seed):
+  return lambda: GameState(seed)
+
+def full_game(seed):
+  """MACRO_GAMES seeded climber games of up to MACRO_CHOICES choices."""
+  def play():
+    for i in xrange(MACRO_GAMES):
+      simulation.play_game(simulation.ClimberPolicy(seed + i), MACRO_CHOICES,
+                           seed + i)
+  return play
+
+# Name -> (function making the callable to time from a seed, calls per run)
+BENCHMARKS = collections.OrderedDict([
+    ("Combat.perform_turn", (combat_turn, 2000)),
+    ("Monster.__init__", (monster_init, 1000)),
+    ("NameGenerator.generate_name", (generate_name, 2000)),
+    ("Equipment.get_new_armor", (new_armor, 2000)),
+    ("GameState.tower_update", (tower_update, 20)),
+    ("GameState.__init__", (game_state_init, 5)),
+    ("full_game", (full_game, 1))])
+
+def run(name, repeat, seed=SEED):
+  """Returns {"us": best, "median": median} microseconds per call."""
+  make, number = BENCHMARKS[name]
+  function = make(seed)
+  times = sorted(1e6 * seconds / number for seconds in
+                 timeit.repeat(function, number=number, repeat=repeat))
+  return {"us": round(times[0], 2), "median": round(times[len(times) // 2], 2)}
+
+def compare(results, baseline, threshold=THRESHOLD):
+  """Returns [(name, result us, baseline us, ratio, regressed)] for every
+  benchmark in both."""
+  rows = []
+  for name, result in results.iteritems():
+    if name not in baseline:
+      continue
+    ratio = result["us"] / baseline[name]["us"]
+    rows.append((name, result["us"], baseline[name]["us"], ratio,
+                 ratio > 1 + threshold))
+  return rows
+
+def load(filename):
+  with open(filename) as file_in:
+    return json.load(file_in)["benchmarks"]
+
+def save(results, filename):
+  data = {"time": time.time(),
+          "python": platform.python_version(),
+          "machine": platform.platform(),
+          "benchmarks": results}
+  with open(filename, "w") as file_out:
+    json.dump(data, file_out, indent=1, separators=(",", ": "),
+              sort_keys=True)
+    file_out.write("\n")
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+  parser.add_argument("names", nargs="*", metavar="name",
+                      help="benchmarks to run (default all): %s" %
+                      ", ".join(BENCHMARKS))
+  parser.add_argument("--repeat", type=int, default=5)
+  parser.add_argument("--seed", type=int, default=SEED)
+  parser.add_argument("--output", help="write results to this JSON file")
+  parser.add_argument("--baseline", default=BASELINE)
+  parser.add_argument("--save-baseline", action="store_true",
+                      help="write results to --baseline instead of "
+                      "comparing")
+  parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                      help="slowdown counted as a regression (default "
+                      "%(default)s, i.e. 15%%)")
+  args = parser.parse_args()
+  for name in args.names:
+    if name not in BENCHMARKS:
+      parser.error("unknown benchmark %s" % name)
+  results = collections.OrderedDict()
+  for name in args.names or BENCHMARKS:
+    results[name] = run(name, args.repeat, args.seed)
+    print "%-28s %12.1f us  (median %.1f)" % (name, results[name]["us"],
+                                              results[name]["median"])
+  if args.output:
+    save(results, args.output)
+  if args.save_baseline:
+    save(results, args.baseline)
+    print "Saved baseline to %s" % args.baseline
+    return
+  if not os.path.exists(args.baseline):
+    print "No baseline at %s; run with --save-baseline" % args.baseline
+    return
+  rows = compare(results, load(args.baseline), args.threshold)
+  print
+  print "%-28s %12s %12s %8s" % ("vs baseline", "now us", "baseline", "ratio")
+  for name, now, before, ratio, regressed in rows:
+    print "%-28s %12.1f %12.1f %7.2fx%s" % (name, now, before, ratio,
+                                           "  REGRESSION" if regressed else "")
+  regressions = [row[0] for row in rows if row[4]]
+  if regressions:
+    print "%d regression(s) over %d%%: %s" % (
+        len(regressions), 100 * args.threshold, ", ".join(regressions))
+    sys.exit(1)
+
+if __name__ == "__main__":
+  main()
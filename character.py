@@ -2,8 +2,10 @@ import random
 import collections
 from skills import SKILLS, SKILL_NAMES
 from equipment import Equipment, RARITY
-from effect import Effect, Buff, Debuff
+from effect import EffectHolder
+from stash import Stash
 import items
+import log_events
 
 STAT_ORDER = ["Strength", "Intellect", "Speed", "Stamina", "Defense",
               "Magic Defense"]
@@ -35,11 +37,16 @@ BLACK = "`0,0,0`"
 # -- Lightning Strike (chance to automatically go again after an attack)
 # -- Dodge (chance to avoid all damage from an attack)
 
-class Character(object):
-  def __init__(self):
+class Character(EffectHolder):
+  def __init__(self, rng=random):
+    super(Character, self).__init__()
+    # Source of randomness, normally shared with the owning GameState
+    self.rng = rng
     # Weapon, Helm, Chest, Legs, Accessory
     self.equipment = [None, None, None, None, None]
     self.items = []
+    # Equipment kept for later instead of being recycled
+    self.stash = Stash()
     self.skills = []
     self.stats = {"Strength": 20, "Stamina": 20, "Defense": 20, "Speed": 20,
                   "Intellect": 20, "Magic Defense": 20}
@@ -54,12 +61,18 @@ class Character(object):
     self.level = 1
     self.exp = 0
     self.materials = [0] * len(RARITY)
-    self.buffs = []
-    self.debuffs = []
     self.runes = 0
     self.traits = collections.defaultdict(int)
-    random.seed()
-    self.reroll_counter = random.randint(0, 1000000)
+    self.reroll_counter = rng.randint(0, 1000000)
+    # Summed stat bonuses of everything equipped, kept up to date by equip
+    # and equipment_changed
+    self.equipment_stats = dict((stat, 0) for stat in self.stats)
+    # Bumped whenever stats or equipment change, so that the memoized
+    # effective stats (also keyed on effects_version) can be reused
+    self.stats_version = 0
+    self.equipment_version = 0
+    self._effective_stats = {}
+    self._effective_versions = None
 
   def colored_hp(self):
     hp_percent = self.current_hp * 100 / self.max_hp
@@ -74,21 +87,21 @@ class Character(object):
     return "%s%d / %d%s" % (color, self.current_hp, self.max_hp, BLACK)
 
   @classmethod
-  def debug_character(cls, level, choice_text):
-    character = Character()
+  def debug_character(cls, level, choice_text, rng=random):
+    character = Character(rng)
     for i in range(1, level):
       character.level_up([])
       trait_choices = character.get_trait_choices()
       choice = ""
       while choice not in TRAITS:
-        choice = random.choice(trait_choices)
+        choice = rng.choice(trait_choices)
       character.learn_trait(choice)
       skill_choices = character.get_skill_choices()
       choice = ""
       while choice not in SKILL_NAMES + ["Improve stats"]:
-        choice = random.choice(skill_choices)
+        choice = rng.choice(skill_choices)
       chance = 10.0 / i
-      if random.random() < chance:
+      if rng.random() < chance:
         character.learn_skill(choice)
       else:
         character.learn_skill("Improve stats")
@@ -99,7 +112,7 @@ class Character(object):
   def make_debug_equipment(self, level, choice):
     for i in range(len(self.equipment)):
       self.equip(Equipment.get_new_armor(level, slot=i, require=choice,
-                                         rarity=3))
+                                         rarity=3, rng=self.rng))
 
   def add_item(self, item):
     if len(self.items) >= 3:
@@ -112,29 +125,31 @@ class Character(object):
     item.apply(self, monster, logs)
 
   def add_buff(self, new_buff):
-    Buff.add_buff(self.buffs, new_buff)
+    super(Character, self).add_buff(new_buff)
     self.recalculate_maxes()
 
   def add_debuff(self, new_debuff):
-    Debuff.add_debuff(self.debuffs, new_debuff)
+    super(Character, self).add_debuff(new_debuff)
     self.recalculate_maxes()
 
   def pass_time(self, time_passed):
     remaining_buffs = []
     for buff in self.buffs:
       if buff.turn_by_turn():
-        for _ in range(time_passed):
-          buff.pass_time(1)
-          effect = Effect.get_combined_impact("HP Restore", self.buffs,
-                                              self.debuffs)
-          self.restore_hp(effect)
-          if not buff.active():
-            break
+        # The buff restores HP once per turn until it runs out (always for at
+        # least one turn). Restores never lower HP, so a single restore capped
+        # at max_hp matches capping after every turn.
+        turns = min(time_passed, max(1, buff.duration))
+        if turns > 0:
+          buff.pass_time(turns)
+          self.restore_hp(turns * self.get_impact("HP Restore"))
       else:
         buff.pass_time(time_passed)
       if buff.active():
         remaining_buffs.append(buff)
-    self.buffs = remaining_buffs
+    # Only replace the list (and drop cached impacts) if something expired
+    if len(remaining_buffs) < len(self.buffs):
+      self.buffs = remaining_buffs
     restored_hp = self.traits["Regeneration"] * 3 * time_passed
     # Not used yet
     restored_sp = self.traits["Clarity of Mind"] * time_passed
@@ -147,8 +162,10 @@ class Character(object):
       debuff.pass_time(time_passed)
       if debuff.active():
         remaining_debuffs.append(debuff)
-    self.debuffs = remaining_debuffs
-    self.recalculate_maxes()
+    # Nothing else changes maxes, so only recalculate if a debuff expired
+    if len(remaining_debuffs) < len(self.debuffs):
+      self.debuffs = remaining_debuffs
+      self.recalculate_maxes()
 
   def gain_gold(self, amount):
     amount_gained = amount * (1.00 + (0.05 * self.traits["Merchant Warrior"]))
@@ -158,7 +175,8 @@ class Character(object):
 
   def make_initial_equipment(self, choice):
     for i in range(len(self.equipment)):
-      self.equip(Equipment.get_new_armor(1, slot=i, require=choice))
+      self.equip(Equipment.get_new_armor(1, slot=i, require=choice,
+                                         rng=self.rng))
 
   def __str__(self):
     pieces = []
@@ -209,6 +227,7 @@ class Character(object):
       pieces.append("\n")
     else:
       pieces.append("None\n")
+    pieces.append("Stashed equipment: %d\n" % len(self.stash))
     pieces.append("Corrupted runes: %d" % self.runes)
     return "".join(pieces)
 
@@ -245,24 +264,41 @@ class Character(object):
       self.buffs = []
 
   def get_effective_stat(self, stat):
-    value = self.stats[stat]
-    for piece in self.equipment:
-      if piece:
-        value += piece.get_stat_value(stat)
-    effect = Effect.get_combined_impact(stat, self.buffs, self.debuffs)
-    value = int(value * effect)
-    return value
+    versions = (self.stats_version, self.equipment_version,
+                self.effects_version)
+    if versions != self._effective_versions:
+      self._effective_stats = {}
+      for name in self.stats:
+        value = self.stats[name] + self.equipment_stats[name]
+        self._effective_stats[name] = int(value * self.get_impact(name))
+      self._effective_versions = versions
+    return self._effective_stats[stat]
+
+  def stats_changed(self):
+    self.stats_version += 1
+
+  def equipment_changed(self):
+    """Call after changing an equipped item in place (enchant, reforge)."""
+    for stat in self.equipment_stats:
+      self.equipment_stats[stat] = sum(piece.get_stat_value(stat)
+                                       for piece in self.equipment if piece)
+    self.equipment_version += 1
 
   def equip(self, item):
     slot = item.slot
     removed = self.equipment[slot]
     self.equipment[slot] = item
+    for stat in self.equipment_stats:
+      if removed:
+        self.equipment_stats[stat] -= removed.get_stat_value(stat)
+      self.equipment_stats[stat] += item.get_stat_value(stat)
+    self.equipment_version += 1
     self.recalculate_maxes()
     return removed
 
   def get_damage(self):
     # 0 is weapon
-    return self.equipment[0].get_damage()
+    return self.equipment[0].get_damage(self.rng)
 
   def get_damage_type(self):
     return self.equipment[0].get_damage_type()
@@ -283,13 +319,16 @@ class Character(object):
     self.current_sp = min(self.current_sp, self.max_sp)  # Unless max_sp drops
 
   def level_up(self, logs):
-    for stat in self.stats:
-      increase = random.randint(1, 3)
+    # Fixed order rather than the dict's, so that a game restored from a
+    # snapshot rolls the same stats as the original would have
+    for stat in STAT_ORDER:
+      increase = self.rng.randint(1, 3)
       if increase > 0:
         self.stats[stat] += increase
         logs.append("You have gained %d %s" % (increase, stat))
-    hp_gain = random.randint(10, 20)
-    sp_gain = random.randint(5, 10)
+    self.stats_changed()
+    hp_gain = self.rng.randint(10, 20)
+    sp_gain = self.rng.randint(5, 10)
     self.base_hp += hp_gain
     self.base_sp += sp_gain
     logs.append("You have gained %d HP" % hp_gain)
@@ -300,8 +339,9 @@ class Character(object):
     return self.gain_exp(level * 25, level, logs, level_adjust=False)
 
   def train_stats(self, logs):
-    stat = random.choice(self.stats.keys())
+    stat = self.rng.choice(STAT_ORDER)
     self.stats[stat] += 1
+    self.stats_changed()
     logs.append("Gained +1 %s" % stat)
 
   def gain_materials(self, materials):
@@ -312,13 +352,13 @@ class Character(object):
     choices = [""]
     reroll_trait_level = self.traits["Self-Improvement"]
     reroll_chance = float(reroll_trait_level) / (reroll_trait_level + 1)
-    if random.random() < reroll_chance:
+    if self.rng.random() < reroll_chance:
       choices.append("Get New Traits")
     while len(choices) < 4:
       best_roll, best_trait = 0.0, None
       for trait in TRAITS:
         rerolls = max(1, int((self.traits[trait] + 1) ** .5))
-        roll = min(random.random() for _ in range(rerolls))
+        roll = min(self.rng.random() for _ in range(rerolls))
         if trait == "Libra" and self.traits[trait] > 0:  # Only one libra level
           roll = 0.0
         if roll > best_roll:
@@ -340,7 +380,10 @@ class Character(object):
     #       three skills? In this case, we'd have to replace one of the existing
     #       skills, which might get tricky.
     choices = []
-    random.seed((self.exp, self.current_hp, self.gold, self.reroll_counter))
+    # Seeded from character state, so the choices do not change until the
+    # character does
+    rng = random.Random((self.exp, self.current_hp, self.gold,
+                         self.reroll_counter))
     choices.append("Improve stats")
     # If we have three skills already, we can just choose from those
     if len(self.skills) == 3:
@@ -348,7 +391,7 @@ class Character(object):
     else:
       reroll_skill_level = self.traits["Scholar"]
       reroll_chance = float(reroll_skill_level) / (reroll_skill_level + 1)
-      if random.random() < reroll_chance:
+      if rng.random() < reroll_chance:
         choices.append("Get New Skills")
       while len(choices) < 4:
         best_roll, best_skill = 0.0, None
@@ -358,7 +401,7 @@ class Character(object):
             rerolls = 1
           else:
             rerolls = int(current_skill.level ** .5)
-          roll = min(random.random() for _ in range(rerolls))
+          roll = min(rng.random() for _ in range(rerolls))
           if roll > best_roll:
             best_roll, best_skill = roll, skill_name
         if best_skill not in choices:
@@ -375,6 +418,7 @@ class Character(object):
     if skill_name == "Improve stats":
       for stat in self.stats:
         self.stats[stat] += 1
+      self.stats_changed()
       self.recalculate_maxes()
       return True
     if skill_name == "Get New Skills":
@@ -401,16 +445,16 @@ class Character(object):
     level_difference = encounter_level - self.level
     if level_adjust:
       exp_gained = int(exp_gained * (1.03 ** level_difference))
-    xp_buff = Effect.get_combined_impact("XP Gain", self.buffs, self.debuffs)
+    xp_buff = self.get_impact("XP Gain")
     total_xp_gain = int(exp_gained * xp_buff)
     self.exp += total_xp_gain
     added_xp = total_xp_gain - exp_gained
-    logs.append("You have gained %d XP (%+d buffs)" % (exp_gained, added_xp))
+    logs.append((log_events.GAIN_XP, exp_gained, added_xp))
     levels_gained = 0
     while self.exp >= self.next_level_exp():
       self.exp -= self.next_level_exp()
       self.level += 1
-      logs.append("You have reached level %d!" % self.level)
+      logs.append((log_events.LEVEL_UP, self.level))
       self.level_up(logs)
       levels_gained += 1
     return levels_gained
@@ -1,5 +1,4 @@
-import random
-from effect import Effect
+import log_events
 from monster import Monster
 
 class Combat(object):
@@ -32,22 +31,18 @@ class Combat(object):
 
     combobreaker_chance = 0.0
     while next_turn == cls.MONSTER_TURN:
-      if Effect.get_combined_impact("Stunned", monster.buffs,
-                                    monster.debuffs) > 0:
-        logs.append("%s is stunned" % monster.name)
+      if monster.get_impact("Stunned") > 0:
+        logs.append((log_events.STUNNED, monster.name))
         return cls.CHARACTER_TURN
       action, info = monster.get_action(character)
       result = cls.perform_action(action, info, monster, character, logs)
       if result == cls.TARGET_DEAD:
-        if Effect.get_combined_impact("Immortal", character.buffs,
-                                      character.debuffs) > 0:
+        if character.get_impact("Immortal") > 0:
           logs.append("You survive due to Last Stand")
           character.current_hp = 1
-        elif Effect.get_combined_impact("Auto Life", character.buffs,
-                                        character.debuffs) > 0:
+        elif character.get_impact("Auto Life") > 0:
           logs.append("Your Auto Life effect restored your HP")
-          effect = Effect.get_combined_impact("Auto Life", character.buffs,
-                                              character.debuffs)
+          effect = character.get_impact("Auto Life")
           character.current_hp = 1
           character.restore_hp(effect - 1)
           # TODO: Fix cohesion
@@ -56,7 +51,7 @@ class Combat(object):
               buff.duration = 0
         else:
           death_chance = 0.95 ** character.traits["Perseverance"]
-          if random.random() < death_chance:
+          if character.rng.random() < death_chance:
             return cls.CHARACTER_DEAD
           else:
             logs.append("Your perseverance saved you from death.")
@@ -66,7 +61,7 @@ class Combat(object):
       next_turn = cls.get_next_actor(character, monster)
       # Combobreaker
       if next_turn == cls.MONSTER_TURN:
-        if random.random() < combobreaker_chance:
+        if character.rng.random() < combobreaker_chance:
           next_turn = cls.CHARACTER_TURN
           logs.append("Combobreaker! prevented the next enemy turn")
       combobreaker_chance += character.traits["Combobreaker!"] / 100.0
@@ -75,14 +70,11 @@ class Combat(object):
   @classmethod
   def perform_action(cls, action, info, actor, target, logs):
     """Performs an action. Returns if target died."""
-    try:
-      method_name = "action_" + action.lower()
-      method = getattr(Combat, method_name)
-      return method(info, actor, target, logs)
-    except AttributeError as exc:
-      print exc
+    method = ACTIONS.get(action)
+    if method is None:
       logs.append("Combat option %s not implemented" % action)
       return cls.TARGET_ALIVE
+    return method(info, actor, target, logs)
 
   @classmethod
   def apply_damage(cls, target, damage):
@@ -104,7 +96,7 @@ class Combat(object):
 
   @classmethod
   def action_skill(cls, info, actor, target, logs):
-    logs.append("%s uses %s" % (actor.name, info.get_name()))
+    logs.append((log_events.SKILL, actor.name, info.get_name()))
     return info.apply_skill(actor, target, logs)
 
   @classmethod
@@ -112,7 +104,7 @@ class Combat(object):
                     multiplier=None, base_damage=None):
     """Attacks, applies damage, returns True if target dies."""
     assert (multiplier is None) or (base_damage is None)
-    logs.append("%s attacks %s" % (actor.name, target.name))
+    logs.append((log_events.ATTACK, actor.name, target.name))
     damage = base_damage or actor.get_damage()
     damage_type = attack_type or actor.get_damage_type()
     damage = cls.apply_traits(damage, damage_type, actor, target)
@@ -133,13 +125,12 @@ class Combat(object):
     level_factor = 1.02 ** (actor.level - target.level)
     damage = int(damage * factor * level_factor)
     if damage > 9999: damage = 9999
-    if Effect.get_combined_impact("Blinded", actor.buffs, actor.debuffs) > 0:
-      if random.random() < .5:
-        logs.append("Misses due to Blindness")
+    if actor.get_impact("Blinded") > 0:
+      if actor.rng.random() < .5:
+        logs.append((log_events.MISS_BLIND,))
         return cls.TARGET_ALIVE
-    color_string = "`255,0,0`" if isinstance(actor, Monster) else ""
-    logs.append("%sHits for %d %s damage`0,0,0`" % (color_string, damage,
-                                                    damage_type))
+    kind = log_events.HURT if isinstance(actor, Monster) else log_events.HIT
+    logs.append((kind, damage, damage_type))
     return cls.apply_damage(target, damage)
 
   @classmethod
@@ -156,7 +147,7 @@ class Combat(object):
     target_stat = target.get_effective_stat(stat)
     total_stat = actor_stat + target_stat
     actor_chance = float(actor_stat) / total_stat
-    if random.random() < actor_chance:
+    if actor.rng.random() < actor_chance:
       return cls.ACTOR_SUCCEEDED
     else:
       return cls.ACTOR_FAILED
@@ -169,3 +160,8 @@ class Combat(object):
     else:
       logs.append("Escape unsuccessful")
       return cls.ACTOR_FAILED
+
+# Action name -> the Combat method performing it, built once at import
+ACTIONS = {"Attack": Combat.action_attack,
+           "Skill": Combat.action_skill,
+           "Escape": Combat.action_escape}
@@ -0,0 +1,156 @@
+"""Vectorized Monte Carlo estimates of Combat outcomes, using NumPy.
+
+Simulates many independent fights between one character and one monster,
+all choosing "Attack" every turn, and mirrors the rules in Combat:
+action_attack, get_next_actor, apply_traits, Perseverance and Combobreaker!.
+
+Effect multipliers (buffs and debuffs) are read once at the start and held
+fixed for the whole fight; durations, Stunned, Last Stand and Auto Life are
+not simulated.
+"""
+import numpy
+from combat import Combat
+
+DAMAGE_CAP = 9999
+
+class CombatEstimate(object):
+  def __init__(self, fights, outcome, turns, character_hp, monster_hp):
+    self.fights = fights
+    # Per fight: Combat.MONSTER_DEAD, Combat.CHARACTER_DEAD or -1 (unresolved)
+    self.outcome = outcome
+    self.turns = turns
+    self.character_hp = character_hp
+    self.monster_hp = monster_hp
+
+  def wins(self):
+    return self.outcome == Combat.MONSTER_DEAD
+
+  def losses(self):
+    return self.outcome == Combat.CHARACTER_DEAD
+
+  def win_probability(self):
+    return float(numpy.count_nonzero(self.wins())) / self.fights
+
+  def expected_turns(self):
+    resolved = self.outcome != -1
+    if not resolved.any():
+      return 0.0
+    return float(self.turns[resolved].mean())
+
+  def hp_remaining(self, percentiles=(10, 50, 90)):
+    """Character HP left after wins, monster HP left after losses."""
+    result = {}
+    for name, hp, mask in (("character", self.character_hp, self.wins()),
+                           ("monster", self.monster_hp, self.losses())):
+      if mask.any():
+        result[name] = numpy.percentile(hp[mask], percentiles).tolist()
+      else:
+        result[name] = [0] * len(percentiles)
+    return result
+
+  def __str__(self):
+    pieces = []
+    pieces.append("Fights: %d" % self.fights)
+    pieces.append("Win probability: %.4f" % self.win_probability())
+    pieces.append("Expected turns: %.2f" % self.expected_turns())
+    hp = self.hp_remaining()
+    pieces.append("Character HP on win (p10/p50/p90): %d / %d / %d" %
+                  tuple(hp["character"]))
+    pieces.append("Monster HP on loss (p10/p50/p90): %d / %d / %d" %
+                  tuple(hp["monster"]))
+    return "\n".join(pieces)
+
+class Attacker(object):
+  """The fixed numbers one side needs to attack the other."""
+  def __init__(self, actor, target, low, high, damage_type):
+    self.low = low
+    self.high = high
+    # Combat.apply_traits
+    if damage_type == "Physical":
+      attack_factor = 1.00 + (.05 * actor.traits["Beefy!"])
+      defense_factor = 0.95 ** target.traits["Stocky!"]
+      attack = actor.get_effective_stat("Strength")
+      defense = target.get_effective_stat("Defense")
+    else:
+      attack_factor = 1.00 + (.05 * actor.traits["Wizardry"])
+      defense_factor = 0.95 ** target.traits["Mental Toughness"]
+      attack = actor.get_effective_stat("Intellect")
+      defense = target.get_effective_stat("Magic Defense")
+    self.trait_factor = attack_factor * defense_factor
+    factor = (float(attack) / defense) ** .5
+    self.factor = factor * (1.02 ** (actor.level - target.level))
+    self.blinded = actor.get_impact("Blinded") > 0
+
+  def damage(self, random_state, count):
+    damage = random_state.randint(self.low, self.high + 1, size=count)
+    # Same order of operations as Combat.apply_traits and action_attack
+    damage = numpy.maximum(1.0, damage * self.trait_factor)
+    damage = numpy.minimum((damage * self.factor).astype(numpy.int64),
+                           DAMAGE_CAP)
+    if self.blinded:
+      damage[random_state.random_sample(count) < .5] = 0
+    return damage
+
+def character_attacker(character, monster):
+  weapon = character.equipment[0]
+  return Attacker(character, monster, weapon.attributes["Low"],
+                  weapon.attributes["High"], character.get_damage_type())
+
+def monster_attacker(monster, character):
+  # Mirrors Monster.get_damage
+  boss_factor = 1.20 if monster.boss else 1.0
+  low = int((10 + (7 * monster.level)) * boss_factor)
+  high = int((20 + (14 * monster.level)) * boss_factor)
+  return Attacker(monster, character, low, high, monster.get_damage_type())
+
+def simulate(character, monster, fights=100000, seed=None, max_turns=1000):
+  """Fights character against copies of monster, returning a CombatEstimate."""
+  random_state = numpy.random.RandomState(seed)
+  hero = character_attacker(character, monster)
+  enemy = monster_attacker(monster, character)
+  character_speed = character.get_effective_stat("Speed")
+  monster_speed = monster.get_effective_stat("Speed")
+  character_first = float(character_speed) / (character_speed + monster_speed)
+  survive_chance = 1.0 - 0.95 ** character.traits["Perseverance"]
+  combobreaker_step = character.traits["Combobreaker!"] / 100.0
+
+  character_hp = numpy.full(fights, character.current_hp, dtype=numpy.int64)
+  monster_hp = numpy.full(fights, monster.current_hp, dtype=numpy.int64)
+  outcome = numpy.full(fights, -1, dtype=numpy.int64)
+  turns = numpy.zeros(fights, dtype=numpy.int64)
+  # Indices of fights that are still going
+  active = numpy.arange(fights)
+
+  for _ in xrange(max_turns):
+    if active.size == 0:
+      break
+    turns[active] += 1
+    # Character attacks
+    monster_hp[active] -= hero.damage(random_state, active.size)
+    dead = monster_hp[active] <= 0
+    outcome[active[dead]] = Combat.MONSTER_DEAD
+    active = active[~dead]
+    # Monster turns, until the character wins a Speed check
+    monster_turn = active[random_state.random_sample(active.size) >=
+                          character_first]
+    combobreaker_chance = 0.0
+    while monster_turn.size:
+      character_hp[monster_turn] -= enemy.damage(random_state,
+                                                 monster_turn.size)
+      fatal = character_hp[monster_turn] <= 0
+      if fatal.any():
+        saved = fatal & (random_state.random_sample(monster_turn.size) <
+                         survive_chance)
+        character_hp[monster_turn[saved]] = 1
+        dead = fatal & ~saved
+        outcome[monster_turn[dead]] = Combat.CHARACTER_DEAD
+        monster_turn = monster_turn[~dead]
+      again = random_state.random_sample(monster_turn.size) >= character_first
+      if combobreaker_chance > 0:
+        broken = random_state.random_sample(monster_turn.size)
+        again &= broken >= combobreaker_chance
+      monster_turn = monster_turn[again]
+      combobreaker_chance += combobreaker_step
+    active = active[outcome[active] == -1]
+
+  return CombatEstimate(fights, outcome, turns, character_hp, monster_hp)
@@ -0,0 +1,71 @@
+"""Sums of many dice, sampled in constant time however many dice there are.
+
+The exact distribution of the sum is built once per (count, die) and
+sampled with an alias table. Above exact_limit dice the sum is drawn from a
+normal distribution with the same mean and variance instead, which keeps
+the tables small; by then the two are very close.
+"""
+import math
+import random
+import numpy
+import alias
+
+# Default number of dice up to which sums are sampled exactly
+EXACT_LIMIT = 100
+
+# (count, die) -> alias table, as made by alias.make_table
+_TABLES = {}
+# (count, die) -> the same table as NumPy arrays, for roll_many
+_ARRAYS = {}
+
+def sum_distribution(count, die):
+  """Probability of each total of count dice, from count up to count * die."""
+  face = numpy.ones(die) / die
+  distribution = numpy.ones(1)
+  for _ in xrange(count):
+    distribution = numpy.convolve(distribution, face)
+  return distribution
+
+def get_table(count, die):
+  key = (count, die)
+  table = _TABLES.get(key)
+  if table is None:
+    distribution = sum_distribution(count, die).tolist()
+    table = alias.make_table(
+        dict((count + i, chance) for i, chance in enumerate(distribution)))
+    _TABLES[key] = table
+  return table
+
+def get_arrays(count, die):
+  key = (count, die)
+  arrays = _ARRAYS.get(key)
+  if arrays is None:
+    arrays = [numpy.array(column) for column in get_table(count, die)]
+    _ARRAYS[key] = arrays
+  return arrays
+
+def moments(count, die):
+  """Mean and standard deviation of the sum of count dice."""
+  mean = count * (die + 1) / 2.0
+  deviation = math.sqrt(count * (die * die - 1) / 12.0)
+  return mean, deviation
+
+def roll(count, die, rng=random, exact_limit=EXACT_LIMIT):
+  """Sum of count rolls of a die numbered 1 to die."""
+  if count <= 0:
+    return 0
+  if count > exact_limit:
+    mean, deviation = moments(count, die)
+    total = int(round(rng.gauss(mean, deviation)))
+    return min(max(total, count), count * die)
+  return alias.sample(get_table(count, die), rng)
+
+def roll_many(count, die, size, random_state, exact_limit=EXACT_LIMIT):
+  """Array of size independent rolls, drawn from a NumPy RandomState."""
+  if count <= 0:
+    return numpy.zeros(size, dtype=numpy.int64)
+  if count > exact_limit:
+    mean, deviation = moments(count, die)
+    totals = numpy.rint(random_state.normal(mean, deviation, size))
+    return numpy.clip(totals, count, count * die).astype(numpy.int64)
+  return alias.sample_many(get_arrays(count, die), size, random_state)
@@ -1,3 +1,4 @@
+import itertools
 from equipment import STATS, DEFENSES
 
 STACK_MULTIPLY = ["XP Gain"] + STATS + DEFENSES
@@ -43,19 +44,19 @@ class Effect(object):
   def get_combined_impact(cls, impact, buffs, debuffs):
     if impact in STACK_MULTIPLY:
       combined_impact = 1.0
-      for effect in buffs + debuffs:
+      for effect in itertools.chain(buffs, debuffs):
         impacts = effect.get_impacts()
         if impact in impacts:
           combined_impact *= impacts[impact]
     elif impact in STACK_MAX:
       combined_impact = 0.0
-      for effect in buffs + debuffs:
+      for effect in itertools.chain(buffs, debuffs):
         impacts = effect.get_impacts()
         if impact in impacts:
           combined_impact = max(impacts[impact], combined_impact)
     elif impact in STACK_ADD:
       combined_impact = 0.0
-      for effect in buffs + debuffs:
+      for effect in itertools.chain(buffs, debuffs):
         impacts = effect.get_impacts()
         if impact in impacts:
           combined_impact += impacts[impact]
@@ -95,6 +96,70 @@ class Debuff(Effect):
       else:
         debuff_list.append(new_debuff)
 
+class EffectHolder(object):
+  """Base for anything that carries buffs and debuffs (Character, Monster).
+
+  Combined impacts are cached per impact name and only recomputed after the
+  set of effects changes. Anything that changes an effect in place, other
+  than through add_buff/add_debuff or replacing the lists, must call
+  effects_changed().
+  """
+  def __init__(self):
+    self._impact_cache = {}
+    # Bumped whenever the cache is invalidated
+    self.effects_version = 0
+    self.buffs = []
+    self.debuffs = []
+
+  @property
+  def buffs(self):
+    return self._buffs
+
+  @buffs.setter
+  def buffs(self, value):
+    self._buffs = value
+    self.effects_changed()
+
+  @property
+  def debuffs(self):
+    return self._debuffs
+
+  @debuffs.setter
+  def debuffs(self, value):
+    self._debuffs = value
+    self.effects_changed()
+
+  def __getstate__(self):
+    # The cache is rebuilt on demand, so it is not worth saving
+    state = self.__dict__.copy()
+    del state["_impact_cache"]
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._impact_cache = {}
+
+  def effects_changed(self):
+    self._impact_cache.clear()
+    self.effects_version += 1
+
+  def get_impact(self, impact):
+    try:
+      return self._impact_cache[impact]
+    except KeyError:
+      combined_impact = Effect.get_combined_impact(impact, self._buffs,
+                                                   self._debuffs)
+      self._impact_cache[impact] = combined_impact
+      return combined_impact
+
+  def add_buff(self, new_buff):
+    Buff.add_buff(self._buffs, new_buff)
+    self.effects_changed()
+
+  def add_debuff(self, new_debuff):
+    Debuff.add_debuff(self._debuffs, new_debuff)
+    self.effects_changed()
+
 class WellRested(Buff):
   # +25% xp, +15% stats
   def get_impacts(self):
@@ -1,5 +1,7 @@
+import math
 import random
 import collections
+import numpy
 
 # TODO: Make stats always be in a specific order [OrderedDict or array]
 
@@ -13,6 +15,10 @@ RARITY_COLORS = ["`160,160,160`", "`0,160,0`", "`0,0,160`", "`160,0,160`",
 ABBREVIATIONS = {"Defense": "Def",
                  "Magic Defense": "MDef"}
 WEAPON_STATS = ["Low", "High", "Type"]
+# Up to this many trials, random draws are made one at a time, which keeps
+# seeded games at normal levels the same. Above it the totals are drawn
+# directly, so the cost does not grow with the level.
+LOOP_LIMIT = 64
 
 class Equipment(object):
   def __init__(self, item_level, attributes, slot, rarity):
@@ -42,10 +48,7 @@ class Equipment(object):
   def comparison_text(cls, old, new):
     assert old.slot == new.slot
     pieces = []
-    attributes = set().union(old.attributes, new.attributes)
-    for attr in attributes:
-      if attr not in STATS and attr not in DEFENSES:
-        continue
+    for attr in STATS + DEFENSES:
       old_attribute = old.attributes[attr] if attr in old.attributes else 0
       new_attribute = new.attributes[attr] if attr in new.attributes else 0
       difference = new_attribute - old_attribute
@@ -62,11 +65,11 @@ class Equipment(object):
         pieces.append("`0,0,0`Weapon type change")
     return "\n".join(pieces)
 
-  def enchant(self):
+  def enchant(self, rng=random):
     self.enchant_count += 1
-    enchanted_stat = random.choice(STATS)
-    amount = random.randint(max(1, self.item_level / 4),
-                            max(1, self.item_level / 2))
+    enchanted_stat = rng.choice(STATS)
+    amount = rng.randint(max(1, self.item_level / 4),
+                         max(1, self.item_level / 2))
     amount = int(amount * (1.0 + 0.25 * self.rarity))
     if enchanted_stat in self.attributes:
       self.attributes[enchanted_stat] += amount
@@ -77,33 +80,29 @@ class Equipment(object):
   def get_stat_value(self, stat):
     return self.attributes[stat]
 
-  def reforge(self, level):
+  def reforge(self, level, rng=random):
     result_pieces = []
     # Stats
     max_gains = (self.rarity + 1) * (level - self.item_level)
-    stat_gains = [0, 0, 0, 0]
-    for _ in xrange(max_gains):
-      stat_gains[random.randint(0, 3)] += 1
+    stat_gains = self.split_gains(max_gains, 4, rng)
     for i in range(4):
-      stat_gains[i] = random.randint(stat_gains[i] / 2, stat_gains[i])
+      stat_gains[i] = rng.randint(stat_gains[i] / 2, stat_gains[i])
       self.attributes[STATS[i]] += stat_gains[i]
       if stat_gains[i] > 0:
         result_pieces.append("%+d %s" % (stat_gains[i], STATS[i]))
     # Defenses
     max_gains = 2 * (level - self.item_level)
-    def_gains = [0, 0]
-    for _ in xrange(max_gains):
-      def_gains[random.randint(0, 1)] += 1
+    def_gains = self.split_gains(max_gains, 2, rng)
     for i in range(2):
-      def_gains[i] = random.randint(def_gains[i] / 2, def_gains[i])
+      def_gains[i] = rng.randint(def_gains[i] / 2, def_gains[i])
       self.attributes[DEFENSES[i]] += def_gains[i]
       if def_gains[i] > 0:
         result_pieces.append("%+d %s" % (def_gains[i], DEFENSES[i]))
     # Weapon Stats
     if self.slot == 0:
       rarity_factor = 1.0 + (.1 * self.rarity)
-      low = int((10 + 5 * level) * random.gauss(1, .2) * rarity_factor)
-      high = int((20 + 7 * level) * random.gauss(1, .2) * rarity_factor)
+      low = int((10 + 5 * level) * rng.gauss(1, .2) * rarity_factor)
+      high = int((20 + 7 * level) * rng.gauss(1, .2) * rarity_factor)
       old_low = self.attributes["Low"]
       old_high = self.attributes["High"]
       old_average = (old_low + old_high) / 2.0
@@ -122,24 +121,38 @@ class Equipment(object):
     return " ".join(result_pieces)
 
   @classmethod
-  def make_stat_value(cls, item_level, rarity):
+  def split_gains(cls, gains, parts, rng=random, loop_limit=LOOP_LIMIT):
+    """Hands out gains one by one to parts chosen uniformly at random,
+    returning how many each part got."""
+    if gains <= loop_limit:
+      counts = [0] * parts
+      for _ in xrange(gains):
+        counts[rng.randint(0, parts - 1)] += 1
+      return counts
+    random_state = numpy.random.RandomState(rng.getrandbits(32))
+    return random_state.multinomial(gains, [1.0 / parts] * parts).tolist()
+
+  @classmethod
+  def make_stat_value(cls, item_level, rarity, rng=random):
     min_stat = max(1, item_level / 2)
     max_stat = min_stat + item_level + rarity
-    return random.randint(min_stat, max_stat)
+    return rng.randint(min_stat, max_stat)
 
-  def get_damage(self):
-    return random.randint(self.attributes["Low"], self.attributes["High"])
+  def get_damage(self, rng=random):
+    return rng.randint(self.attributes["Low"], self.attributes["High"])
 
   def get_damage_type(self):
     return self.attributes["Type"]
 
-  def get_recycled_materials(self):
+  def get_recycled_materials(self, rng=random, loop_limit=LOOP_LIMIT):
+    if self.item_level > loop_limit:
+      return self.skip_recycled_materials(rng)
     materials = [0] * len(RARITY)
     count = 0
     for _ in xrange(self.item_level):
-      if random.random() > .7 ** count:
+      if rng.random() > .7 ** count:
         continue
-      rarity = int(self.rarity + random.gauss(0, 1))
+      rarity = int(self.rarity + rng.gauss(0, 1))
       if rarity < 0:
         continue
       if rarity >= len(RARITY):
@@ -148,6 +161,30 @@ class Equipment(object):
       count += 1
     return materials
 
+  def skip_recycled_materials(self, rng=random):
+    """Same distribution as the get_recycled_materials loop, but jumps
+    straight to the next iteration that yields a material."""
+    materials = [0] * len(RARITY)
+    # Chance that rarity + gauss(0, 1) truncates to a rarity of 0 or more
+    keep_chance = 0.5 * math.erfc((-1 - self.rarity) / math.sqrt(2))
+    remaining = self.item_level
+    count = 0
+    while remaining > 0:
+      success = keep_chance * .7 ** count
+      if success < 1.0:
+        # Geometric number of iterations without a material
+        skipped = int(math.log(1.0 - rng.random()) / math.log1p(-success))
+        if skipped >= remaining:
+          break
+        remaining -= skipped
+      remaining -= 1
+      value = self.rarity + rng.gauss(0, 1)
+      while value <= -1:
+        value = self.rarity + rng.gauss(0, 1)
+      materials[min(int(value), len(RARITY) - 1)] += 1
+      count += 1
+    return materials
+
   @classmethod
   def materials_string(cls, materials):
     pieces = []
@@ -170,23 +207,24 @@ class Equipment(object):
     return value
 
   @classmethod
-  def get_new_armor(cls, item_level, slot=None, require=None, rarity=1):
+  def get_new_armor(cls, item_level, slot=None, require=None, rarity=1,
+                    rng=random):
     attributes = collections.defaultdict(int)
     if slot is None:
-      slot = random.randint(0, len(SLOTS) - 1)
+      slot = rng.randint(0, len(SLOTS) - 1)
     slots = 1 + rarity
     if require:
-      attributes[require] = cls.make_stat_value(item_level, rarity)
+      attributes[require] = cls.make_stat_value(item_level, rarity, rng)
       slots -= 1
     for _ in range(slots):
-      attributes[random.choice(STATS)] += cls.make_stat_value(item_level,
-                                                              rarity)
+      attributes[rng.choice(STATS)] += cls.make_stat_value(item_level, rarity,
+                                                           rng)
     for defense in DEFENSES:
-      attributes[defense] = cls.make_stat_value(item_level, rarity)
+      attributes[defense] = cls.make_stat_value(item_level, rarity, rng)
     if SLOTS[slot] == "Weapon":
       rarity_factor = 1.0 + (.1 * rarity)
-      low = int((10 + 5 * item_level) * random.gauss(1, .2) * rarity_factor)
-      high = int((20 + 7 * item_level) * random.gauss(1, .2) * rarity_factor)
+      low = int((10 + 5 * item_level) * rng.gauss(1, .2) * rarity_factor)
+      high = int((20 + 7 * item_level) * rng.gauss(1, .2) * rarity_factor)
       if low > high:
         low, high = high, low
       if low < 1:
@@ -198,7 +236,7 @@ class Equipment(object):
       elif require == "Intellect":
         attributes["Type"] = "Magic"
       else:
-        attributes["Type"] = random.choice(("Magic", "Physical"))
+        attributes["Type"] = rng.choice(("Magic", "Physical"))
     return Equipment(item_level, attributes, slot, rarity)
 
   def __str__(self):
@@ -213,17 +251,16 @@ class Equipment(object):
       pieces.append("(%s %d-%d) " % (self.attributes["Type"],
                                      self.attributes["Low"],
                                      self.attributes["High"]))
+    # Listed in a fixed order, not in the order of the attributes dict
     defense_pieces = []
     stat_pieces = []
-    for attr in self.attributes:
-      if attr in STATS:
-        if self.attributes[attr] > 0:
-          stat_pieces.append("%+d %s " % (self.attributes[attr], attr))
-      elif attr in DEFENSES:
+    for attr in STATS:
+      if attr in self.attributes and self.attributes[attr] > 0:
+        stat_pieces.append("%+d %s " % (self.attributes[attr], attr))
+    for attr in DEFENSES:
+      if attr in self.attributes:
         defense_pieces.append("%d %s" % (self.attributes[attr],
                                          ABBREVIATIONS[attr]))
-      else:
-        assert attr in WEAPON_STATS
     pieces.append("(%s) " % " / ".join(defense_pieces))
     pieces.append("".join(stat_pieces))
     pieces.append("`0,0,0`")
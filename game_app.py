@@ -1,8 +1,15 @@
 # TODO: Get rid of pylint disables in pylintrc and fix
 
+import cgi
+import collections
 import time
 from game_state import GameState
+import log_events
+import log_writer
+import replay
+import snapshot
 import wx
+import wx.html
 import wx.richtext
 
 # TODO: Look into using unicode graphics for some of this stuff
@@ -29,21 +36,54 @@ import wx.richtext
 # TODO: Consider making everything work against elites instead
 # TODO: Consider allowing replacing skills
 
+SAVE_WILDCARD = "SRS Game saves (*.srs)|*.srs|All files (*.*)|*.*"
+# Log entries kept for the log panel. Older ones are only in the log file.
+MAX_LOG_ENTRIES = 10000
+BLACK = (0, 0, 0)
+
+def color_runs(string):
+  """Splits color-coded text (see write_color_text) into a list of
+  ((r, g, b), text) runs. Empty runs are left out, and neighbouring runs
+  of the same color are joined."""
+  # Text, color, text, color, ..., text
+  tokens = string.split("`")
+  colors = [BLACK] + [tuple(map(int, color.split(",")))
+                      for color in tokens[1::2]]
+  runs = []
+  for color, text in zip(colors, tokens[::2]):
+    if not text:
+      continue
+    if runs and runs[-1][0] == color:
+      runs[-1] = (color, runs[-1][1] + text)
+    else:
+      runs.append((color, text))
+  return runs
+
 def write_color_text(rtc, string):
   # Takes a wx.richtext.RichTextCtrl and writes my wacky custom color-coded
   # text out to it.
   # Colors are specified via `r,g,b` in the text
   # Note: Assumes there are no "`" in the text.
-  tokens = string.split("`")
-  rtc.SetInsertionPoint(rtc.GetLastPosition())
-  rtc.BeginTextColour((0, 0, 0))
-  rtc.BeginParagraphSpacing(0, 0)
-  rtc.WriteText(tokens.pop(0))
-  while tokens:
-    color_string = tokens.pop(0)
-    r, g, b = map(int, color_string.split(","))  # pylint: disable=invalid-name
-    rtc.BeginTextColour((r, g, b))
-    rtc.WriteText(tokens.pop(0))
+  # The text is parsed into runs first, and every Begin style call has its
+  # End, even if writing fails, so the control's style stack does not grow
+  # with each write. Redrawing waits until the whole string is written, and
+  # it scrolls once.
+  runs = color_runs(string)
+  rtc.Freeze()
+  try:
+    rtc.SetInsertionPoint(rtc.GetLastPosition())
+    rtc.BeginParagraphSpacing(0, 0)
+    try:
+      for color, text in runs:
+        rtc.BeginTextColour(color)
+        try:
+          rtc.WriteText(text)
+        finally:
+          rtc.EndTextColour()
+    finally:
+      rtc.EndParagraphSpacing()
+  finally:
+    rtc.Thaw()
   rtc.ShowPosition(rtc.GetLastPosition())
 
 class ButtonPanel(wx.Panel):
@@ -85,33 +125,57 @@ class CharacterPanel(wx.Panel):
     self.text_field.SetValue("")
     write_color_text(self.text_field, str(game_state.character))
 
+class LogList(wx.html.HtmlListBox):
+  """Virtual list of log entries: only the rows on screen are ever drawn,
+  so its cost does not grow with the number of entries. Rows are HTML, so
+  each keeps every color of its entry."""
+  def __init__(self, parent, entries):
+    wx.html.HtmlListBox.__init__(self, parent, style=wx.BORDER)
+    self.entries = entries
+
+  @staticmethod
+  def row_html(seconds, runs):
+    pieces = [time.strftime("%m/%d/%y %H:%M:%S: ", time.localtime(seconds))]
+    for color, text in runs:
+      text = cgi.escape(text).replace("  ", " &nbsp;").replace("\n", "<br>")
+      pieces.append('<font color="#%02x%02x%02x">%s</font>' % (color +
+                                                                (text,)))
+    return "".join(pieces)
+
+  def OnGetItem(self, item):  # pylint: disable=invalid-name
+    seconds, runs = self.entries[item]
+    return self.row_html(seconds, runs)
+
 class LogPanel(wx.Panel):
   def __init__(self, parent):
     wx.Panel.__init__(self, parent, wx.NewId())
-    style = wx.TE_READONLY | wx.TE_MULTILINE | wx.BORDER
-    self.text_field = wx.richtext.RichTextCtrl(self, value="", style=style)
+    # (time, color_runs of the text) of the newest entries
+    self.entries = collections.deque(maxlen=MAX_LOG_ENTRIES)
+    self.log_list = LogList(self, self.entries)
     bsizer = wx.BoxSizer()
-    bsizer.Add(self.text_field, 1, wx.EXPAND)
+    bsizer.Add(self.log_list, 1, wx.EXPAND)
     self.SetSizerAndFit(bsizer)
     time_string = time.strftime("%m%d%y_%H%M%S", time.localtime())
     self.filename = "srs_game_%s.log" % time_string
-    self.filehandle = open(self.filename, "w")
-    self.max_length = 16384
+    # Writes and flushes the file from its own thread
+    self.log_writer = log_writer.LogWriter(self.filename)
 
   def add_entry(self, text):
-    line = time.strftime("%m/%d/%y %H:%M:%S: ", time.localtime()) + text + "\n"
-    write_color_text(self.text_field, line)
-    self.filehandle.write(line)
-    self.filehandle.flush()
-    length = self.text_field.GetLastPosition()
-    if length > self.max_length:
-      # The text field lags on add if there is too much text. Keep it to a
-      # reasonable size
-      position = self.text_field.GetLastPosition() - (self.max_length / 2)
-      new_line_position = self.text_field.GetValue().find("\n", position)
-      if new_line_position == -1:
-        new_line_position = position
-      self.text_field.Remove(0, new_line_position + 1)
+    self.add_entries([text])
+
+  def add_entries(self, texts):
+    if not texts:
+      return
+    now = time.time()
+    for text in texts:
+      self.entries.append((now, color_runs(text)))
+      self.log_writer.write(text, now)
+    count = len(self.entries)
+    self.log_list.SetItemCount(count)
+    if count == self.entries.maxlen:
+      # Full, so every row moved up. Only the visible rows are redrawn.
+      self.log_list.RefreshAll()
+    self.log_list.ScrollToLine(count - 1)
 
 
 class EncounterPanel(wx.Panel):
@@ -143,9 +207,13 @@ class MainWindow(wx.Frame):
     menu_exit = file_menu.Append(wx.NewId(), "E&xit", "Game over!")
     restart = file_menu.Append(wx.NewId(), "&Restart\tCtrl+R",
                                "Restart the game")
+    save = file_menu.Append(wx.NewId(), "&Save\tCtrl+S", "Save the game")
+    load = file_menu.Append(wx.NewId(), "&Load\tCtrl+L", "Load a saved game")
     menu_bar.Append(file_menu, "&File")
     self.Bind(wx.EVT_MENU, self.on_exit, menu_exit)
     self.Bind(wx.EVT_MENU, self.on_restart, restart)
+    self.Bind(wx.EVT_MENU, self.on_save, save)
+    self.Bind(wx.EVT_MENU, self.on_load, load)
     self.SetMenuBar(menu_bar)
 
     self.top_sizer = wx.BoxSizer(wx.HORIZONTAL)   # Top level
@@ -192,19 +260,31 @@ class MainWindow(wx.Frame):
                 self.button_press(evt, temp), id=event_id)
     # Accelerators for menu items
     entries.append((wx.ACCEL_CTRL, ord("R"), restart.GetId()))
+    entries.append((wx.ACCEL_CTRL, ord("S"), save.GetId()))
+    entries.append((wx.ACCEL_CTRL, ord("L"), load.GetId()))
 
     accel_table = wx.AcceleratorTable(entries)
     self.SetAcceleratorTable(accel_table)
 
     # Update UI with initial game state
+    self.journal_writer = None
     self.initialize()
 
     self.Show()
 
   def initialize(self):
     self.game_state = GameState()
+    self.start_journal()
     self.update_ui(character=False)
 
+  def start_journal(self):
+    # Every session is recorded, so it can be replayed with replay.py
+    if self.journal_writer:
+      self.journal_writer.close()
+    time_string = time.strftime("%m%d%y_%H%M%S", time.localtime())
+    self.journal_writer = replay.JournalWriter(
+        "srs_game_%s.journal" % time_string, self.game_state)
+
   def update_ui(self, character=True):
     if character:
       self.char_panel.update(self.game_state)
@@ -231,19 +311,48 @@ class MainWindow(wx.Frame):
   def button_press(self, evt, number):  # pylint: disable=unused-argument
     if not self.button_panel.buttons[number].IsEnabled():
       return
+    self.journal_writer.record(number)
     logs = self.game_state.apply_choice(number)
-    for log in logs:
-      # TODO: We should add more logging to just the file
-      self.log_panel.add_entry(log)
+    # TODO: We should add more logging to just the file
+    self.log_panel.add_entries(log_events.texts(logs))
     self.update_ui()
 
   def on_exit(self, evt):  # pylint: disable=unused-argument
-    self.log_panel.filehandle.close()
+    self.log_panel.log_writer.close()
+    self.journal_writer.close()
     self.Close(True)
 
   def on_restart(self, evt):  # pylint: disable=unused-argument
     self.initialize()
 
+  def on_save(self, evt):  # pylint: disable=unused-argument
+    dialog = wx.FileDialog(self, "Save game", wildcard=SAVE_WILDCARD,
+                           style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+    if dialog.ShowModal() == wx.ID_OK:
+      path = dialog.GetPath()
+      try:
+        snapshot.save(self.game_state, path)
+        self.log_panel.add_entry("Saved game to %s" % path)
+      except IOError as error:
+        self.log_panel.add_entry("Could not save game: %s" % error)
+    dialog.Destroy()
+
+  def on_load(self, evt):  # pylint: disable=unused-argument
+    dialog = wx.FileDialog(self, "Load game", wildcard=SAVE_WILDCARD,
+                           style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST)
+    if dialog.ShowModal() == wx.ID_OK:
+      path = dialog.GetPath()
+      try:
+        self.game_state = snapshot.load(path)
+      except (IOError, ValueError) as error:
+        self.log_panel.add_entry("Could not load game: %s" % error)
+      else:
+        self.log_panel.add_entry("Loaded game from %s" % path)
+        self.start_journal()
+        created = self.game_state.current_state() != "CHAR_CREATE"
+        self.update_ui(character=created)
+    dialog.Destroy()
+
   def set_labels(self, labels):
     self.button_panel.set_labels(labels)
 
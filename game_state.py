@@ -1,9 +1,13 @@
 """Represents the current state of the game. Main game logic module."""
 import random
+import auto_battle
+import log_events
+import metrics
 from character import Character, TRAITS
 from monster import Monster
 from combat import Combat
 from equipment import Equipment
+from predictor import Predictor
 from quest import Quest
 import rooms
 from items import Item
@@ -11,7 +15,6 @@ import skills
 
 # TODO: Start here: Write Jolt Cup-level external docs
 # TODO: Log more. Certainly including victory
-# TODO: Equipment keeping predictor?
 
 TOWN_BUILDINGS = [rooms.ArmorShop, rooms.Enchanter, rooms.Forge,
                   rooms.Alchemist, rooms.TrainingRoom, rooms.Temple,
@@ -30,7 +33,7 @@ CHOICES = {"CHAR_CREATE": ["Strength", "Stamina", "Speed", "Intellect"],
                       "Descend Tower"],
            "STRONGHOLD": ["Enter Room", "Rest", "Item", "Leave Stronghold"],
            "DUNGEON": ["Explore", "Rest", "Item", "Leave Dungeon"],
-           "LOOT_EQUIPMENT": ["", "Keep Current", "Keep New", ""],
+           "LOOT_EQUIPMENT": ["", "Keep Current", "Keep New", "Stash New"],
            "VICTORY": [""] * 4,
            "ACCEPT_QUEST": ["", "Accept Quest", "Decline Quest", ""]}
 
@@ -44,6 +47,8 @@ DEATH_TIME_FACTOR = {"TOWER": 1.0, "QUEST": 0.5, "DUNGEON": 0.7,
 
 TOWER_LEVELS = 50
 UPDATE_TIME = 360
+# Auto Battle hands control back after this many turns
+AUTO_BATTLE_TURNS = 200
 DEBUG_FLOOR = None
 DEBUG_BUILDING = None
 DEBUG_GOLD = None
@@ -86,9 +91,20 @@ class GameState(object):
     choices, and the UI will then call GameState.apply_choice, which updates
     the GameState.
   """
-  def __init__(self):
+  def __init__(self, seed=None, keep_logs=True):
+    # Every random choice in this game comes from self.rng, so a game can be
+    # reproduced from its seed.
+    if seed is None:
+      seed = random.SystemRandom().getrandbits(64)
+    self.seed = seed
+    self.rng = random.Random(seed)
+    # Every choice passed to apply_choice. With the seed, this is enough to
+    # replay the whole game (see replay.py).
+    self.journal = []
+    # False for headless runs, where apply_choice returns no logs
+    self.keep_logs = keep_logs
     self.state = ["CHAR_CREATE"]
-    self.character = Character()
+    self.character = Character(self.rng)
     if DEBUG_GOLD:
       self.character.gold = DEBUG_GOLD
     self.floor = 1
@@ -100,6 +116,9 @@ class GameState(object):
     self.tower_lock[1] = False
     self.tower_faction = [1.0] * (TOWER_LEVELS + 1)
     self.tower_update_ready = False
+    # Incremented by each tower update. Shops rebuild their stock when they
+    # are next entered, rather than all of them at every update.
+    self.tower_epoch = 0
     self.tower_quests = self.generate_quests()
     # Number of encounters remaining in current tower ascension
     self.ascension_encounters = 0
@@ -129,39 +148,39 @@ class GameState(object):
   # Helper methods for changing state
   ###
 
-  @staticmethod
-  def generate_quests():
+  def generate_quests(self):
     quests = [None]
     for i in xrange(1, TOWER_LEVELS + 1):
-      quests.append(Quest(i))
+      quests.append(Quest(i, self.rng))
     return quests
 
-  @staticmethod
-  def generate_towns():
+  @metrics.timed("generate_towns")
+  def generate_towns(self):
     # Level 0 does not exist
     tower = [None]
     for level in range(1, TOWER_LEVELS):
-      shop_set = set()
-      while len(shop_set) < 3:
-        shop_set.add(random.choice(TOWN_BUILDINGS))
+      # Three different buildings. Not a set, so the order depends only on
+      # the seed.
+      shop_types = self.rng.sample(TOWN_BUILDINGS, 3)
       shops = []
-      for shop in shop_set:
-        shops.append(shop(level))
+      for shop in shop_types:
+        shops.append(shop(level, self.rng))
       tower.append(shops)
     if DEBUG_BUILDING:
-      tower[DEBUG_FLOOR][0] = DEBUG_BUILDING(DEBUG_FLOOR)
-    summit_shops = [rooms.Inn(TOWER_LEVELS), rooms.Temple(TOWER_LEVELS),
-                    rooms.Crafthall(TOWER_LEVELS)]
+      tower[DEBUG_FLOOR][0] = DEBUG_BUILDING(DEBUG_FLOOR, self.rng)
+    summit_shops = [rooms.Inn(TOWER_LEVELS, self.rng),
+                    rooms.Temple(TOWER_LEVELS, self.rng),
+                    rooms.Crafthall(TOWER_LEVELS, self.rng)]
     tower.append(summit_shops)
-    base_floor_shops = [rooms.Inn(1), rooms.Temple(1), rooms.Alchemist(1)]
+    base_floor_shops = [rooms.Inn(1, self.rng), rooms.Temple(1, self.rng),
+                        rooms.Alchemist(1, self.rng)]
     tower[1] = base_floor_shops
     return tower
 
+  @metrics.timed("tower_update")
   def tower_update(self):
     self.tower_quests = self.generate_quests()
-    for level in xrange(1, TOWER_LEVELS + 1):
-      for shop in range(3):
-        self.towns[level][shop].refresh()
+    self.tower_epoch += 1
 
   def time_to_refresh(self):
     return UPDATE_TIME - (self.time_spent % UPDATE_TIME)
@@ -192,66 +211,78 @@ class GameState(object):
 
   def get_choices(self):
     """Return choices for next actions for the UI."""
-    current_state = self.current_state()
-    if current_state in CHOICES:
-      return CHOICES[current_state]
-    if current_state == "TOWN":
-      choices = [shop.get_name() for shop in self.towns[self.floor]]
-      return ["Leave Town"] + choices
-    elif current_state == "SHOP":
-      return self.current_shop.get_buttons(self.character)
-    elif current_state == "OUTSIDE":
-      choices = []
-      choices.append("" if self.tower_lock[self.floor] else "Ascend Tower")
-      choices.append("Quest" if self.tower_quests[self.floor] else "")
-      choices.append("Town")
-      choices.append("Descend Tower")
-      return choices
-    elif current_state == "QUEST":
-      if self.quest.complete():
-        return ["Complete Quest", "", "", "Leave Quest"]
-      else:
-        return ["Continue Quest", "Rest", "Item", "Leave Quest"]
-    elif current_state == "COMBAT":
-      if self.monster.boss or self.infinity_dungeon or self.rune_level != -1:
-        return ["Attack", "Skill", "Item", ""]
-      else:
-        return ["Attack", "Skill", "Item", "Escape"]
-    elif current_state == "USE_ITEM":
-      choices = []
-      for i in range(len(self.character.items)):
-        choices.append("Use Item #%d" % (i + 1))
-      while len(choices) < 3:
-        choices.insert(0, "")
-      choices.append("Never Mind")
+    current_state = self.state[-1]
+    choices = CHOICES.get(current_state)
+    if choices is not None:
       return choices
-    elif current_state == "LEVEL_UP":
-      return self.trait_choices
-    elif current_state == "LEVEL_UP_SKILL":
-      return self.skill_choices
-      # Next: Handle the trait choice, then implement the traits
-    elif current_state == "USE_SKILL":
-      choices = [""] * (3 - len(self.character.skills))
-      for skill in self.character.skills:
-        if (skill.sp_cost() > self.character.current_sp or
-            (skill.once_per_battle() and skill.get_name() in self.skills_used)):
-          choices.append("")
-        else:
-          choices.append(skill.get_name())
-      choices.append("Never Mind")
-      return choices
-    else:
+    builder = CHOICE_BUILDERS.get(current_state)
+    if builder is None:
       return ["Error", "Error", "Error", "Error"]
+    return builder(self)
+
+  def town_choices(self):
+    choices = [shop.get_name() for shop in self.towns[self.floor]]
+    return ["Leave Town"] + choices
+
+  def shop_choices(self):
+    return self.current_shop.get_buttons(self.character)
+
+  def outside_choices(self):
+    choices = []
+    choices.append("" if self.tower_lock[self.floor] else "Ascend Tower")
+    choices.append("Quest" if self.tower_quests[self.floor] else "")
+    choices.append("Town")
+    choices.append("Descend Tower")
+    return choices
+
+  def quest_choices(self):
+    if self.quest.complete():
+      return ["Complete Quest", "", "", "Leave Quest"]
+    else:
+      return ["Continue Quest", "Rest", "Item", "Leave Quest"]
+
+  def combat_choices(self):
+    # Auto Battle takes the place of Escape when escaping is not allowed
+    if self.monster.boss or self.infinity_dungeon or self.rune_level != -1:
+      return ["Attack", "Skill", "Item", "Auto Battle"]
+    else:
+      return ["Attack", "Skill", "Item", "Escape"]
+
+  def use_item_choices(self):
+    choices = []
+    for i in range(len(self.character.items)):
+      choices.append("Use Item #%d" % (i + 1))
+    while len(choices) < 3:
+      choices.insert(0, "")
+    choices.append("Never Mind")
+    return choices
+
+  def level_up_choices(self):
+    return self.trait_choices
+
+  def level_up_skill_choices(self):
+    return self.skill_choices
+
+  def use_skill_choices(self):
+    choices = [""] * (3 - len(self.character.skills))
+    for skill in self.character.skills:
+      if (skill.sp_cost() > self.character.current_sp or
+          (skill.once_per_battle() and skill.get_name() in self.skills_used)):
+        choices.append("")
+      else:
+        choices.append(skill.get_name())
+    choices.append("Never Mind")
+    return choices
 
   def handle_treasure(self, logs):
     while self.treasure_queue:
       item = self.treasure_queue.pop()
       if isinstance(item, int):
         amount_gained = self.character.gain_gold(item)
-        logs.append("You got %d gold." % amount_gained)
+        logs.append((log_events.GOLD, amount_gained))
       elif isinstance(item, Equipment):
         logs.append("You got the following equipment")
-        logs.append(str(item))
+        logs.append((log_events.EQUIPMENT, item))
         self.add_state("LOOT_EQUIPMENT")
         self.equipment_choice = item
         break  # Have to give choice to player
@@ -265,7 +296,8 @@ class GameState(object):
     if self.rune_level == 0:
       logs.append("Unpurified, the rune dissolves into dust.")
       return
-    item = Equipment.get_new_armor(self.rune_level, slot=4, rarity=4)
+    item = Equipment.get_new_armor(self.rune_level, slot=4, rarity=4,
+                                   rng=self.rng)
     self.treasure_queue.append(item)
     self.rune_level = -1
     self.handle_treasure(logs)
@@ -302,7 +334,8 @@ class GameState(object):
 
   def apply_choice_char_create(self, logs, choice_text):
     if DEBUG_CHARACTER:
-      self.character = Character.debug_character(DEBUG_CHARACTER, choice_text)
+      self.character = Character.debug_character(DEBUG_CHARACTER, choice_text,
+                                                 self.rng)
       self.character.skills[1] = skills.HolyBlade(7)
       self.character.skills[0] = skills.BulkUp(7)
       self.character.runes = 5
@@ -314,9 +347,9 @@ class GameState(object):
   def start_combat(self, logs, boss_chance, level=None):
     if level is None:
       level = self.floor
-    boss = random.random() < boss_chance
+    boss = self.rng.random() < boss_chance
     self.add_state("COMBAT")
-    self.monster = Monster(level, boss)
+    self.monster = Monster(level, boss, self.rng)
     logs.append("You have encountered a monster")
 
   def apply_choice_rune_world(self, logs, choice_text):
@@ -360,7 +393,7 @@ class GameState(object):
 
   def apply_choice_quest(self, logs, choice_text):
     if choice_text == "Continue Quest":
-      self.pass_time(random.randint(1, 3), logs)
+      self.pass_time(self.rng.randint(1, 3), logs)
       logs.append("You continue the quest...")
       self.add_state("COMBAT")
       self.monster = self.quest.get_monster()
@@ -369,7 +402,7 @@ class GameState(object):
       self.pass_time(5, logs)
       logs.append("You rest")
       hp_gained = self.character.rest()
-      logs.append("You regain %d HP" % hp_gained)
+      logs.append((log_events.REGAIN_HP, hp_gained))
     elif choice_text == "Item":
       self.pass_time(0, logs)
       self.add_state("USE_ITEM")
@@ -389,7 +422,7 @@ class GameState(object):
       self.leave_state()
       if self.current_state() == "OUTSIDE":
         if regenerate_quest:
-          self.tower_quests[self.floor] = Quest(self.floor)
+          self.tower_quests[self.floor] = Quest(self.floor, self.rng)
         else:
           self.tower_quests[self.floor] = None
       if levelups > 0:
@@ -408,7 +441,7 @@ class GameState(object):
       self.pass_time(5, logs)
       logs.append("You rest")
       hp_gained = self.character.rest()
-      logs.append("You regain %d HP" % hp_gained)
+      logs.append((log_events.REGAIN_HP, hp_gained))
     elif choice_text == "Item":
       self.pass_time(0, logs)
       self.add_state("USE_ITEM")
@@ -419,7 +452,7 @@ class GameState(object):
 
   def handle_explore(self, logs, explore_type):
     chances = EXPLORE_CHANCES[explore_type]
-    random_number = random.random()
+    random_number = self.rng.random()
     if random_number < chances[0]:
       logs.append("You find a treasure hoard!")
       self.find_treasure(logs, 8)
@@ -427,13 +460,14 @@ class GameState(object):
       logs.append("You find a shop")
       self.character.restore_hp()
       self.character.restore_sp()
-      shop = random.choice(TOWER_BUILDINGS)(self.floor)
+      shop = self.rng.choice(TOWER_BUILDINGS)(self.floor, self.rng)
       self.add_state("SHOP")
       self.current_shop = shop
       if self.floor > TOWER_LEVELS:  # Infinity Dungeon
         faction = 1.0
       else:
         faction = self.tower_faction[self.floor]
+      shop.check_refresh(self.tower_epoch)
       shop.enter_shop(faction)
     elif random_number < sum(chances[0:3]):
       logs.append("You find a treasure chest")
@@ -445,7 +479,7 @@ class GameState(object):
 
   def apply_choice_tower(self, logs, choice_text):
     if choice_text == "Explore":
-      self.pass_time(random.randint(1, 10), logs)
+      self.pass_time(self.rng.randint(1, 10), logs)
       logs.append("You explore the tower...")
       if self.ascension_encounters > 0:
         self.ascension_encounters -= 1
@@ -470,8 +504,8 @@ class GameState(object):
       self.pass_time(5, logs)
       logs.append("You rest")
       hp_gained = self.character.rest()
-      logs.append("You regain %d HP" % hp_gained)
-      if random.random() < .2:
+      logs.append((log_events.REGAIN_HP, hp_gained))
+      if self.rng.random() < .2:
         self.start_combat(logs, .1)
     elif choice_text == "Item":
       self.pass_time(0, logs)
@@ -484,16 +518,16 @@ class GameState(object):
   def find_treasure(self, logs, item_count):
     treasure = []
     for i in range(item_count):
-      if random.random() < .5:
+      if self.rng.random() < .5:
         min_gold = self.floor * 10
         max_gold = self.floor * 20
-        treasure.append(random.randint(min_gold, max_gold))
+        treasure.append(self.rng.randint(min_gold, max_gold))
       else:
-        rarity = min(random.randint(1, 4) for _ in range(3))
+        rarity = min(self.rng.randint(1, 4) for _ in range(3))
         if self.infinity_dungeon:
-          rarity = max(rarity, min(random.randint(1, 4) for _ in range(3)))
-        level = max(1, int(self.floor + random.gauss(0, 1)))
-        treasure.append(Equipment.get_new_armor(level, rarity))
+          rarity = max(rarity, min(self.rng.randint(1, 4) for _ in range(3)))
+        level = max(1, int(self.floor + self.rng.gauss(0, 1)))
+        treasure.append(Equipment.get_new_armor(level, rarity, rng=self.rng))
     self.treasure_queue = treasure
     self.handle_treasure(logs)
 
@@ -501,7 +535,7 @@ class GameState(object):
     if choice_text == "Explore":
       if self.infinity_dungeon:
         self.floor += 1
-      self.pass_time(random.randint(1, 5), logs)
+      self.pass_time(self.rng.randint(1, 5), logs)
       logs.append("You explore the dungeon...")
       if self.infinity_dungeon:
         self.handle_explore(logs, "Infinity Dungeon")
@@ -511,8 +545,8 @@ class GameState(object):
       self.pass_time(5, logs)
       logs.append("You rest")
       hp_gained = self.character.rest()
-      logs.append("You regain %d HP" % hp_gained)
-      if random.random() < .2 or self.infinity_dungeon:
+      logs.append((log_events.REGAIN_HP, hp_gained))
+      if self.rng.random() < .2 or self.infinity_dungeon:
         self.start_combat(logs, .1)
     elif choice_text == "Item":
       self.pass_time(0, logs)
@@ -549,9 +583,9 @@ class GameState(object):
     self.character.apply_death(logs)
     self.change_state("TOWN")
     factor = DEATH_TIME_FACTOR[state]
-    time_lost = random.randint(1, int(3 * self.floor * factor))
+    time_lost = self.rng.randint(1, int(3 * self.floor * factor))
     self.pass_time(time_lost, logs)
-    logs.append("You lost %d time units" % time_lost)
+    logs.append((log_events.TIME_LOST, time_lost))
 
   def dungeon_victory_update(self, base_floor):
     if self.infinity_dungeon:
@@ -568,7 +602,7 @@ class GameState(object):
       self.apply_death(logs)
     elif result == Combat.MONSTER_DEAD:
       self.skills_used = set()
-      logs.append("You have defeated %s" % self.monster.name)
+      logs.append((log_events.DEFEATED, self.monster.name))
       levelups = self.character.gain_exp(self.monster.calculate_exp(),
                                          self.monster.level, logs)
       self.treasure_queue = self.monster.get_treasure(self.infinity_dungeon)
@@ -585,6 +619,8 @@ class GameState(object):
       if levelups > 0:
         self.levelups = levelups
         self.skillups = levelups
+        self.trait_choices = self.character.get_trait_choices()
+        self.skill_choices = self.character.get_skill_choices()
         self.add_state("LEVEL_UP")
       self.handle_treasure(logs)
 
@@ -610,6 +646,41 @@ class GameState(object):
         logs.append("You escaped successfully")
         self.monster = None
         self.leave_state()
+    elif choice_text == "Auto Battle":
+      self.auto_battle(auto_battle.DEFAULT, logs=logs)
+
+  def auto_battle(self, policy=None, max_turns=AUTO_BATTLE_TURNS, logs=None):
+    """Fights the current combat until it ends, or for max_turns turns, with
+    policy (an AutoBattlePolicy) choosing each action. Returns the logs."""
+    if logs is None:
+      logs = []
+    if self.current_state() != "COMBAT":
+      return logs
+    policy = policy or auto_battle.DEFAULT
+    monster = self.monster
+    turns = 0
+    while (turns < max_turns and self.current_state() == "COMBAT" and
+           self.monster is monster):
+      action, target = policy.choose(self)
+      if action == "Item":
+        # Items do not use up a turn
+        self.apply_choice_combat(logs, "Item")
+        self.apply_choice_use_item(logs, "Use Item #%d" % (target + 1))
+        if self.current_state() != "USE_ITEM":
+          continue
+        self.apply_choice_use_item(logs, "Never Mind")
+        action = "Attack"
+      if action == "Skill":
+        self.apply_choice_combat(logs, "Skill")
+        self.apply_choice_use_skill(logs, target)
+      else:
+        self.apply_choice_combat(logs, "Attack")
+      turns += 1
+    if self.monster is monster and self.current_state() == "COMBAT":
+      logs.append("Auto battle stopped after %d turns" % turns)
+    else:
+      logs.append("Auto battle finished in %d turns" % turns)
+    return logs
 
   def apply_choice_use_skill(self, logs, choice_text):
     if choice_text == "Never Mind":
@@ -666,6 +737,7 @@ class GameState(object):
         self.pass_time(1, logs)
         logs.append("Went to the %s" % shop.get_name())
         self.add_state("SHOP")
+        shop.check_refresh(self.tower_epoch)
         shop.enter_shop(self.tower_faction[self.floor])
 
   def apply_choice_shop(self, logs, choice_text):
@@ -687,6 +759,8 @@ class GameState(object):
     elif result == self.current_shop.LEVEL_UP:
       self.levelups = 1
       self.skillups = 1
+      self.trait_choices = self.character.get_trait_choices()
+      self.skill_choices = self.character.get_skill_choices()
       self.add_state("LEVEL_UP")
     else:
       assert False
@@ -714,7 +788,7 @@ class GameState(object):
       self.pass_time(10, logs)
       if self.frontier <= self.floor:
         self.add_state("TOWER")
-        self.ascension_encounters = random.randint(5, 10)
+        self.ascension_encounters = self.rng.randint(5, 10)
         logs.append("Entered tower")
       else:
         self.floor += 1
@@ -742,38 +816,53 @@ class GameState(object):
         logs.append("Cannot descend while on floor 1.")
 
   def apply_choice_loot_equipment(self, logs, choice_text):
+    if choice_text == "Stash New":
+      self.character.stash.add(self.equipment_choice)
+      logs.append((log_events.STASHED, self.equipment_choice))
+      self.equipment_choice = None
+      self.leave_state()
+      self.handle_treasure(logs)
+      return
     if choice_text == "Keep Current":
       recycle = self.equipment_choice
     elif choice_text == "Keep New":
       recycle = self.character.equip(self.equipment_choice)
       self.equipment_choice = None
-    logs.append("Recycled %s" % recycle)
-    materials = recycle.get_recycled_materials()
+    logs.append((log_events.RECYCLED, recycle))
+    materials = recycle.get_recycled_materials(self.rng)
     self.character.gain_materials(materials)
-    logs.append("Received %s" % Equipment.materials_string(materials))
+    logs.append((log_events.MATERIALS, materials))
     # Add materials to character, add materials inventory to character string
     self.leave_state()
     self.handle_treasure(logs)
 
   def apply_choice(self, choice):
-    """Apply the given action choice to this gamestate, modifying it."""
-    logs = []
-    current_state = self.current_state()
+    """Apply the given action choice to this gamestate, modifying it.
+    Returns the logs, a list of strings and log_events events."""
+    logs = [] if self.keep_logs else log_events.NullLog()
+    self.journal.append(choice)
+    current_state = self.state[-1]
     choice_text = self.get_choices()[choice]
-    method_name = "apply_choice_" + current_state.lower()
-    try:
-      method = getattr(GameState, method_name)
-      method(self, logs, choice_text)
-    #except AttributeError as exc:
-    except IOError as exc:
-      print exc  # pylint: disable=print-statement
+    transition = TRANSITIONS.get(current_state)
+    if transition is None:
       logs.append("apply_choice not implemented yet, state: %s" % current_state)
+    elif metrics.registry.enabled:
+      start = metrics.clock()
+      transition(self, logs, choice_text)
+      metrics.registry.record_since("apply_choice",
+                                    (current_state, choice_text), start)
+    else:
+      transition(self, logs, choice_text)
     return logs
 
   def loot_choice_text(self):
     slot = self.equipment_choice.slot
-    return Equipment.equipment_comparison_text(self.character.equipment[slot],
-                                               self.equipment_choice)
+    pieces = []
+    pieces.append(Equipment.equipment_comparison_text(
+        self.character.equipment[slot], self.equipment_choice))
+    pieces.append(Predictor.recommendation_text(self.character,
+                                                self.equipment_choice))
+    return "\n".join(pieces)
 
   def use_item_text(self):
     pieces = []
@@ -857,3 +946,35 @@ class GameState(object):
       return "You win! Victory Time: %d" % self.time_spent
     else:
       return "Error, no text for state %s" % current_state
+
+# Built once at import, so that a choice is dispatched with a dictionary
+# lookup. States with the same choices every time are in CHOICES, the rest
+# build them with a method.
+CHOICE_BUILDERS = {"TOWN": GameState.town_choices,
+                   "SHOP": GameState.shop_choices,
+                   "OUTSIDE": GameState.outside_choices,
+                   "QUEST": GameState.quest_choices,
+                   "COMBAT": GameState.combat_choices,
+                   "USE_ITEM": GameState.use_item_choices,
+                   "LEVEL_UP": GameState.level_up_choices,
+                   "LEVEL_UP_SKILL": GameState.level_up_skill_choices,
+                   "USE_SKILL": GameState.use_skill_choices}
+
+# State -> the method applying a choice made in that state
+TRANSITIONS = {"CHAR_CREATE": GameState.apply_choice_char_create,
+               "RUNE_WORLD": GameState.apply_choice_rune_world,
+               "ACCEPT_QUEST": GameState.apply_choice_accept_quest,
+               "USE_ITEM": GameState.apply_choice_use_item,
+               "QUEST": GameState.apply_choice_quest,
+               "STRONGHOLD": GameState.apply_choice_stronghold,
+               "TOWER": GameState.apply_choice_tower,
+               "DUNGEON": GameState.apply_choice_dungeon,
+               "COMBAT": GameState.apply_choice_combat,
+               "USE_SKILL": GameState.apply_choice_use_skill,
+               "LEVEL_UP": GameState.apply_choice_level_up,
+               "LEVEL_UP_SKILL": GameState.apply_choice_level_up_skill,
+               "TOWN": GameState.apply_choice_town,
+               "SHOP": GameState.apply_choice_shop,
+               "SUMMIT": GameState.apply_choice_summit,
+               "OUTSIDE": GameState.apply_choice_outside,
+               "LOOT_EQUIPMENT": GameState.apply_choice_loot_equipment}
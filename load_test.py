@@ -0,0 +1,135 @@
+"""Local load test for server.py: many clients playing random games at once.
+
+Starts a server in this process unless --port is given, then runs client
+threads that each open a connection, create sessions and press random
+buttons, and reports throughput, latency percentiles and busy responses.
+"""
+# pylint: disable=print-statement
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+import server
+from simulation import percentile
+
+class Client(object):
+  def __init__(self, address):
+    self.sock = socket.create_connection(address)
+    self.file_in = self.sock.makefile("r")
+    self.next_id = 0
+
+  def request(self, op, **fields):
+    self.next_id += 1
+    fields["op"] = op
+    fields["id"] = self.next_id
+    self.sock.sendall(json.dumps(fields) + "\n")
+    response = json.loads(self.file_in.readline())
+    assert response.get("id") == self.next_id
+    return response
+
+  def close(self):
+    self.file_in.close()
+    self.sock.close()
+
+class Stats(object):
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.latencies = []
+    self.busy = 0
+    self.errors = []
+
+  def add(self, latencies, busy, errors):
+    with self.lock:
+      self.latencies.extend(latencies)
+      self.busy += busy
+      self.errors.extend(errors)
+
+def run_client(address, sessions, choices, seed, stats):
+  rng = random.Random(seed)
+  client = Client(address)
+  latencies = []
+  busy = []
+  errors = []
+  def timed(op, **fields):
+    while True:
+      start = time.time()
+      response = client.request(op, **fields)
+      latencies.append(time.time() - start)
+      if response.get("error") != "busy":
+        return response
+      # Back off a little before retrying
+      busy.append(op)
+      time.sleep(0.001 * rng.randint(1, 10))
+  try:
+    for _ in xrange(sessions):
+      response = timed("new", seed=rng.getrandbits(32))
+      if "error" in response:
+        errors.append(response["error"])
+        continue
+      session = response["session"]
+      options = response["choices"]
+      for _ in xrange(choices):
+        choice = rng.choice([i for i, text in enumerate(options) if text])
+        response = timed("apply", session=session, choice=choice)
+        if "error" in response:
+          errors.append(response["error"])
+          break
+        options = response["choices"]
+      timed("close", session=session)
+  finally:
+    client.close()
+    stats.add(latencies, len(busy), errors)
+
+def run_load_test(address, clients, sessions, choices, seed=0):
+  stats = Stats()
+  threads = [threading.Thread(target=run_client,
+                              args=(address, sessions, choices, seed + i,
+                                    stats))
+             for i in xrange(clients)]
+  start = time.time()
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return stats, time.time() - start
+
+def main():
+  parser = argparse.ArgumentParser(description="Load test the game server")
+  parser.add_argument("--port", type=int, default=None,
+                      help="Use a running server instead of starting one")
+  parser.add_argument("--clients", type=int, default=50)
+  parser.add_argument("--sessions", type=int, default=2,
+                      help="Sessions each client plays, one after another")
+  parser.add_argument("--choices", type=int, default=200)
+  parser.add_argument("--workers", type=int, default=server.WORKERS)
+  parser.add_argument("--queue-size", type=int, default=server.QUEUE_SIZE)
+  args = parser.parse_args()
+  game_server = None
+  if args.port is None:
+    game_server = server.GameServer(port=0, workers=args.workers,
+                                    queue_size=args.queue_size)
+    address = game_server.address
+    thread = threading.Thread(target=game_server.serve_forever)
+    thread.daemon = True
+    thread.start()
+  else:
+    address = (server.HOST, args.port)
+  stats, elapsed = run_load_test(address, args.clients, args.sessions,
+                                 args.choices)
+  latencies = sorted(stats.latencies)
+  print "Requests: %d in %.2fs (%.1f/sec)" % (len(latencies), elapsed,
+                                              len(latencies) / elapsed)
+  print "Latency ms: p50 %.2f / p90 %.2f / p99 %.2f / max %.2f" % tuple(
+      1000 * percentile(latencies, fraction)
+      for fraction in (0.5, 0.9, 0.99, 1.0))
+  print "Busy: %d  Errors: %d" % (stats.busy, len(stats.errors))
+  if stats.errors:
+    print "First error: %s" % stats.errors[0]
+  if game_server:
+    game_server.stop()
+    thread.join()
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,56 @@
+"""Structured log events, formatted into text only when someone reads them.
+
+Busy game paths append events to logs instead of formatted strings. An
+event is a tuple of a type code and its fields, e.g. (ATTACK, actor_name,
+target_name), which is several times cheaper to build than the text.
+Whatever shows logs turns them into text with text() or texts(). Plain
+strings can still be appended to logs, and pass through unchanged.
+
+Fields are only formatted when read, so they should not be changed in
+the meantime (e.g. an Equipment piece that gets enchanted).
+"""
+from equipment import Equipment
+
+(ATTACK, HIT, HURT, MISS_BLIND, SKILL, STUNNED, GAIN_XP, LEVEL_UP, GOLD,
+ EQUIPMENT, DEFEATED, REGAIN_HP, RECYCLED, STASHED, MATERIALS,
+ TIME_LOST) = range(16)
+
+# Type code -> format string for the fields, or a function of the fields
+FORMATS = {ATTACK: "%s attacks %s",
+           HIT: "Hits for %d %s damage`0,0,0`",
+           # A monster hitting the character
+           HURT: "`255,0,0`Hits for %d %s damage`0,0,0`",
+           MISS_BLIND: "Misses due to Blindness",
+           SKILL: "%s uses %s",
+           STUNNED: "%s is stunned",
+           GAIN_XP: "You have gained %d XP (%+d buffs)",
+           LEVEL_UP: "You have reached level %d!",
+           GOLD: "You got %d gold.",
+           EQUIPMENT: str,
+           DEFEATED: "You have defeated %s",
+           REGAIN_HP: "You regain %d HP",
+           RECYCLED: "Recycled %s",
+           STASHED: "Stashed %s",
+           MATERIALS: lambda materials: "Received %s" % (
+               Equipment.materials_string(materials)),
+           TIME_LOST: "You lost %d time units"}
+
+def text(entry):
+  """Returns the text of a log entry, an event or a string."""
+  if isinstance(entry, basestring):
+    return entry
+  form = FORMATS[entry[0]]
+  if isinstance(form, basestring):
+    return form % entry[1:]
+  return form(*entry[1:])
+
+def texts(logs):
+  return [text(entry) for entry in logs]
+
+class NullLog(list):
+  """A logs list that drops everything, for runs where nobody reads logs."""
+  def append(self, entry):
+    pass
+
+  def extend(self, entries):
+    pass
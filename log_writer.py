@@ -0,0 +1,151 @@
+"""Writes log files from a background thread, so the UI never waits on disk.
+
+write() only queues a line with its time. A writer thread formats what is
+queued, writes it in one batch and flushes the file every FLUSH_INTERVAL
+seconds, or as soon as FLUSH_LINES lines are waiting, rather than after
+every line. The queue is bounded: if the disk falls so far behind that it
+fills, lines are dropped rather than blocking the caller, and the file
+notes how many.
+
+close() drains the queue. Writers still open when an exception reaches
+sys.excepthook are flushed, and at exit they are closed, so a crash keeps
+the lines leading up to it.
+"""
+import atexit
+import collections
+import sys
+import threading
+import time
+
+QUEUE_SIZE = 10000
+FLUSH_INTERVAL = 1.0
+FLUSH_LINES = 256
+# Longest a crash or exit waits on each writer thread, in seconds
+CRASH_TIMEOUT = 2.0
+
+# Open LogWriters, flushed on crashes and closed at exit
+_open_writers = []
+_previous_excepthook = None
+
+class Stamper(object):
+  """Formats the time at the start of log lines, once per second."""
+  def __init__(self):
+    self.second = None
+    self.stamp = ""
+
+  def line(self, seconds, text):
+    second = int(seconds)
+    if second != self.second:
+      self.second = second
+      self.stamp = time.strftime("%m/%d/%y %H:%M:%S: ", time.localtime(second))
+    return self.stamp + text + "\n"
+
+class LogWriter(object):
+  def __init__(self, filename, queue_size=QUEUE_SIZE,
+               flush_interval=FLUSH_INTERVAL, flush_lines=FLUSH_LINES):
+    self.filename = filename
+    self.filehandle = open(filename, "w")
+    self.queue_size = queue_size
+    self.flush_interval = flush_interval
+    self.flush_lines = flush_lines
+    # (time, text) of lines not written yet. Appending to and popping from
+    # a deque are atomic, so write() takes no lock: a Queue would cost more
+    # than the write and flush this replaces.
+    self.pending = collections.deque()
+    # Set to have the writer thread write and flush now
+    self.wake = threading.Event()
+    self.lock = threading.Lock()
+    # Events to set after the writer thread's next flush
+    self.waiting = []
+    # Lines dropped since the writer thread last noted it in the file
+    self.dropped = 0
+    self.closed = False
+    self.stamper = Stamper()
+    self.thread = threading.Thread(target=self.run, name="LogWriter")
+    self.thread.daemon = True
+    self.thread.start()
+    _register(self)
+
+  def write(self, text, seconds=None):
+    """Queues a line, stamped with seconds (default now)."""
+    if self.closed:
+      raise ValueError("write to closed LogWriter %s" % self.filename)
+    if seconds is None:
+      seconds = time.time()
+    pending = self.pending
+    if len(pending) >= self.queue_size:
+      with self.lock:
+        self.dropped += 1
+      return
+    pending.append((seconds, text))
+    if len(pending) == self.flush_lines:
+      self.wake.set()
+
+  def flush(self, timeout=None):
+    """Waits until everything written so far is flushed to the file.
+    Returns False if that took longer than timeout seconds."""
+    if self.closed:
+      return not self.thread.is_alive()
+    done = threading.Event()
+    with self.lock:
+      self.waiting.append(done)
+    self.wake.set()
+    done.wait(timeout)
+    return done.is_set()
+
+  def close(self, timeout=None):
+    """Writes everything queued, then closes the file."""
+    if self.closed:
+      return
+    self.closed = True
+    _open_writers.remove(self)
+    self.wake.set()
+    self.thread.join(timeout)
+
+  def run(self):
+    pending = self.pending
+    while True:
+      self.wake.wait(self.flush_interval)
+      self.wake.clear()
+      # Read before draining, so the lines written before close() are
+      # written
+      closing = self.closed
+      with self.lock:
+        waiting, self.waiting = self.waiting, []
+        dropped, self.dropped = self.dropped, 0
+      pieces = []
+      while pending:
+        seconds, text = pending.popleft()
+        pieces.append(self.stamper.line(seconds, text))
+      if dropped:
+        pieces.append(self.stamper.line(
+            time.time(), "%d log lines dropped, the log writer fell behind" %
+            dropped))
+      if pieces:
+        self.filehandle.write("".join(pieces))
+        self.filehandle.flush()
+      for done in waiting:
+        done.set()
+      if closing:
+        self.filehandle.close()
+        return
+
+def flush_all(timeout=CRASH_TIMEOUT):
+  for writer in list(_open_writers):
+    writer.flush(timeout)
+
+def close_all(timeout=CRASH_TIMEOUT):
+  for writer in list(_open_writers):
+    writer.close(timeout)
+
+def _excepthook(exc_type, value, traceback):
+  flush_all()
+  _previous_excepthook(exc_type, value, traceback)
+
+def _register(writer):
+  global _previous_excepthook  # pylint: disable=global-statement
+  if _previous_excepthook is None:
+    _previous_excepthook = sys.excepthook
+    sys.excepthook = _excepthook
+    atexit.register(close_all)
+  _open_writers.append(writer)
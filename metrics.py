@@ -0,0 +1,180 @@
+"""In-process metrics: latency histograms and counters.
+
+Histograms are HDR-style: values (microseconds) go into log-linear buckets
+with SUB_BUCKETS buckets per power of two, so any value is kept to within
+about 3% whatever its size, in a fixed, small amount of memory.
+
+Timings are recorded into the module-level registry. It is on by default;
+with registry.enabled False, each timed call only costs an attribute check.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import timeit
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+PERCENTILES = (50, 90, 99, 99.9)
+DUMP_INTERVAL = 60
+
+clock = timeit.default_timer
+
+def bucket_index(value):
+  if value < 2 * SUB_BUCKETS:
+    return value
+  shift = value.bit_length() - SUB_BUCKET_BITS - 1
+  return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+def bucket_range(index):
+  """Lowest and highest values that go in bucket index."""
+  if index < 2 * SUB_BUCKETS:
+    return index, index
+  shift = index // SUB_BUCKETS - 1
+  low = (index - shift * SUB_BUCKETS) << shift
+  return low, low + (1 << shift) - 1
+
+class Histogram(object):
+  def __init__(self):
+    self.counts = []
+    self.count = 0
+    self.total = 0
+    self.min = float("inf")
+    self.max = 0
+
+  def record(self, value):
+    value = int(value) if value > 0 else 0
+    # bucket_index, inlined as this is called for every timed call
+    if value < 2 * SUB_BUCKETS:
+      index = value
+    else:
+      shift = value.bit_length() - SUB_BUCKET_BITS - 1
+      index = (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+    counts = self.counts
+    if index >= len(counts):
+      counts.extend([0] * (index + 1 - len(counts)))
+    counts[index] += 1
+    self.count += 1
+    self.total += value
+    if value > self.max:
+      self.max = value
+    if value < self.min:
+      self.min = value
+
+  def percentile(self, percent):
+    """Highest value of the bucket holding the given percentile, or 0."""
+    if not self.count:
+      return 0
+    target = max(1, percent / 100.0 * self.count)
+    seen = 0
+    for index, count in enumerate(self.counts):
+      seen += count
+      if seen >= target:
+        return min(bucket_range(index)[1], self.max)
+    return self.max
+
+  def mean(self):
+    return float(self.total) / self.count if self.count else 0.0
+
+  def to_dict(self):
+    result = {"count": self.count, "min": self.min if self.count else 0,
+              "max": self.max,
+              "mean": round(self.mean(), 1)}
+    for percent in PERCENTILES:
+      result["p%s" % percent] = self.percentile(percent)
+    # [lowest value, count] for every bucket in use
+    result["buckets"] = [[bucket_range(index)[0], count]
+                         for index, count in enumerate(self.counts) if count]
+    return result
+
+class Registry(object):
+  def __init__(self, enabled=True):
+    self.enabled = enabled
+    self.lock = threading.Lock()
+    # (name, labels tuple) -> Histogram or count
+    self.histograms = {}
+    self.counters = {}
+    self.dump_thread = None
+    self.dump_stop = threading.Event()
+
+  def record(self, name, labels, microseconds):
+    key = (name, labels)
+    self.lock.acquire()
+    try:
+      histogram = self.histograms.get(key)
+      if histogram is None:
+        histogram = self.histograms[key] = Histogram()
+      histogram.record(microseconds)
+    finally:
+      self.lock.release()
+
+  def record_since(self, name, labels, start):
+    """Records the time since start (from clock()) in microseconds."""
+    self.record(name, labels, 1e6 * (clock() - start))
+
+  def count(self, name, labels=(), amount=1):
+    key = (name, labels)
+    with self.lock:
+      self.counters[key] = self.counters.get(key, 0) + amount
+
+  def reset(self):
+    with self.lock:
+      self.histograms = {}
+      self.counters = {}
+
+  def snapshot(self):
+    """All metrics as a JSON-friendly dict."""
+    with self.lock:
+      histograms = [{"name": name, "labels": list(labels),
+                     "microseconds": histogram.to_dict()}
+                    for (name, labels), histogram
+                    in sorted(self.histograms.iteritems())]
+      counters = [{"name": name, "labels": list(labels), "count": count}
+                  for (name, labels), count
+                  in sorted(self.counters.iteritems())]
+    return {"time": time.time(), "histograms": histograms,
+            "counters": counters}
+
+  def dump(self, filename):
+    # Written to a temporary file first, so readers never see half a dump
+    temporary = filename + ".tmp"
+    with open(temporary, "w") as file_out:
+      json.dump(self.snapshot(), file_out, indent=1, sort_keys=True)
+    os.rename(temporary, filename)
+
+  def start_dumping(self, filename, interval=DUMP_INTERVAL):
+    """Dumps to filename every interval seconds, from a daemon thread."""
+    self.stop_dumping()
+    self.dump_stop.clear()
+    def run():
+      while not self.dump_stop.wait(interval):
+        self.dump(filename)
+      self.dump(filename)
+    self.dump_thread = threading.Thread(target=run)
+    self.dump_thread.daemon = True
+    self.dump_thread.start()
+
+  def stop_dumping(self):
+    """Stops periodic dumps, after writing one last dump."""
+    if self.dump_thread is not None:
+      self.dump_stop.set()
+      self.dump_thread.join()
+      self.dump_thread = None
+
+registry = Registry()
+
+def timed(name):
+  """Decorator recording each call's duration and count under name."""
+  def decorate(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+      if not registry.enabled:
+        return function(*args, **kwargs)
+      start = clock()
+      try:
+        return function(*args, **kwargs)
+      finally:
+        registry.record_since(name, (), start)
+    return wrapper
+  return decorate
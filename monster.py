@@ -1,13 +1,14 @@
 import collections
 import random
+import dice
+import metrics
 from equipment import Equipment
-from effect import Debuff, Effect
+from effect import EffectHolder
 from name_generator import NameGenerator
 
 STAT_ORDER = ["Strength", "Intellect", "Speed", "Stamina", "Defense",
               "Magic Defense"]
 
-# TODO: Should Monster and Character subclass from something?
 CHANCE_TIERS = {1: [0.0, 0.2, 0.04, 0.008, 0.00016],
                 2: [0.0, 0.4, 0.16, 0.064, 0.0256],
                 3: [0.0, 0.5, 0.25, 0.125, 0.0625]}
@@ -22,8 +23,11 @@ STAT_DICE = {"Strength": (12, 1),
              "Speed": (12, 1),
              "Stamina": (10, 1)}
 
-class Monster(object):
-  def __init__(self, level, boss):
+class Monster(EffectHolder):
+  @metrics.timed("Monster")
+  def __init__(self, level, boss, rng=random):
+    super(Monster, self).__init__()
+    self.rng = rng
     self.stats = {}
     # TODO: Gaussian variance was not great, something else?
     self.level = level
@@ -31,26 +35,43 @@ class Monster(object):
     # If you modify these, make sure to modify the XP calc
     for stat in STAT_DICE:
       die, modifier = STAT_DICE[stat]
-      self.stats[stat] = self.roll_stat(self.level, die, modifier)
+      self.stats[stat] = self.roll_stat(self.level, die, modifier, rng)
     if boss:
       for stat in self.stats:
         self.stats[stat] = self.stats[stat] * 1.3
       self.stats["Stamina"] *= 4   # Effectively x5.2
     for stat in self.stats:
       # 75-125% change
-      self.stats[stat] *= (random.random() * 0.5) + 0.75
+      self.stats[stat] *= (rng.random() * 0.5) + 0.75
       self.stats[stat] = int(self.stats[stat])
       self.stats[stat] = max(1, self.stats[stat])
     self.max_hp = self.stats["Stamina"] * 5
     self.current_hp = self.max_hp
+    self.name = self.make_name(NAME_GENERATOR.generate_name(rng), self.level,
+                               boss)
+    self.traits = collections.defaultdict(int)
+
+  @classmethod
+  def from_batch(cls, batch, index):
+    """Builds the Monster for row index of a MonsterBatch."""
+    monster = cls.__new__(cls)
+    EffectHolder.__init__(monster)
+    monster.rng = batch.rng
+    monster.stats = batch.stat_dict(index)
+    monster.level = batch.level
+    monster.boss = batch.boss(index)
+    monster.max_hp = int(batch.max_hp[index])
+    monster.current_hp = monster.max_hp
+    monster.name = batch.name(index)
+    monster.traits = collections.defaultdict(int)
+    return monster
+
+  @classmethod
+  def make_name(cls, name, level, boss):
     if boss:
-      self.name = "%s (Level %d Elite)" % (NAME_GENERATOR.generate_name(),
-                                           self.level)
+      return "%s (Level %d Elite)" % (name, level)
     else:
-      self.name = "%s (Level %d)" % (NAME_GENERATOR.generate_name(), self.level)
-    self.traits = collections.defaultdict(int)
-    self.buffs = []
-    self.debuffs = []
+      return "%s (Level %d)" % (name, level)
 
   def hp_string(self):
     percent = int(100 * self.current_hp / self.max_hp)
@@ -62,10 +83,8 @@ class Monster(object):
       debuff.pass_time(amount)
       if debuff.active():
         remaining_debuffs.append(debuff)
-    self.debuffs = remaining_debuffs
-
-  def add_debuff(self, new_debuff):
-    Debuff.add_debuff(self.debuffs, new_debuff)
+    if len(remaining_debuffs) < len(self.debuffs):
+      self.debuffs = remaining_debuffs
 
   def libra_string(self, libra_level):
     pieces = []
@@ -123,22 +142,23 @@ class Monster(object):
     boss_factor = 4 if self.boss else 1
     min_gold = 5 * self.level * boss_factor
     max_gold = 15 * self.level * boss_factor
-    treasure.append(random.randint(min_gold, max_gold))
+    treasure.append(self.rng.randint(min_gold, max_gold))
     treasure_tier = 1
     treasure_tier += (1 if self.boss else 0)
     treasure_tier += (1 if infinity else 0)
     chances = CHANCE_TIERS[treasure_tier]
     for rarity in range(1, len(chances)):
-      while random.random() < chances[rarity]:
-        treasure.append(Equipment.get_new_armor(self.level, rarity=rarity))
+      while self.rng.random() < chances[rarity]:
+        treasure.append(Equipment.get_new_armor(self.level, rarity=rarity,
+                                                rng=self.rng))
     rune_chance = RUNE_CHANCES[treasure_tier]
-    while random.random() < rune_chance:
+    while self.rng.random() < rune_chance:
       treasure.append("Rune")
     return treasure
 
   def get_effective_stat(self, stat):
     value = self.stats[stat]
-    effect = Effect.get_combined_impact(stat, self.buffs, self.debuffs)
+    effect = self.get_impact(stat)
     value = int(value * effect)
     return value
 
@@ -147,7 +167,7 @@ class Monster(object):
     low = (10 + (7 * self.level)) * boss_factor
     high = (20 + (14 * self.level)) * boss_factor
     low, high = int(low), int(high)
-    return random.randint(low, high)
+    return self.rng.randint(low, high)
 
   def get_damage_type(self):
     if (self.get_effective_stat("Intellect") >
@@ -157,8 +177,8 @@ class Monster(object):
       return "Physical"
 
   @classmethod
-  def roll_stat(cls, level, die, modifier):
-    return sum(random.randint(1, die) + modifier for _ in xrange(level))
+  def roll_stat(cls, level, die, modifier, rng=random):
+    return dice.roll(level, die, rng) + level * modifier
 
   def get_action(self, character):
     # Monster AI
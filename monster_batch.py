@@ -0,0 +1,96 @@
+"""Vectorized generation of many monsters of one level at once, using NumPy.
+
+Stats, HP, boss flags and XP values are held as arrays with one row per
+monster, rolled with the same rules as Monster.__init__. Monster objects are
+only built when one is needed, e.g. when it enters combat.
+"""
+import random
+import numpy
+import dice
+import metrics
+from monster import Monster, NAME_GENERATOR, STAT_DICE, STAT_ORDER
+
+class MonsterBatch(object):
+  @metrics.timed("MonsterBatch")
+  def __init__(self, level, bosses, rng=random):
+    """bosses is a sequence of booleans, one per monster."""
+    self.level = level
+    # Used by the Monsters built from this batch, e.g. for treasure
+    self.rng = rng
+    random_state = numpy.random.RandomState(rng.getrandbits(32))
+    self.bosses = numpy.array(bosses, dtype=bool)
+    count = len(self.bosses)
+    stats = numpy.empty((count, len(STAT_ORDER)))
+    for column, stat in enumerate(STAT_ORDER):
+      die, modifier = STAT_DICE[stat]
+      stats[:, column] = self.roll_stats(count, level, die, modifier,
+                                         random_state)
+    stats[self.bosses] *= 1.3
+    stats[self.bosses, STAT_ORDER.index("Stamina")] *= 4   # Effectively x5.2
+    # 75-125% change
+    stats *= random_state.random_sample(stats.shape) * 0.5 + 0.75
+    self.stats = numpy.maximum(1, stats.astype(numpy.int64))
+    self.max_hp = self.stats[:, STAT_ORDER.index("Stamina")] * 5
+    self.xp = self.calculate_exp(self.stats)
+    # Names are rolled from their own seeds, so they do not depend on the
+    # order monsters are looked at in
+    self.name_seeds = random_state.randint(0, 2 ** 31, size=count)
+    self._names = [None] * count
+    self._monsters = {}
+
+  def __len__(self):
+    return len(self.bosses)
+
+  def __getstate__(self):
+    # Snapshots only store builtin types, so arrays are saved as lists
+    state = self.__dict__.copy()
+    for name in ("bosses", "stats", "max_hp", "xp", "name_seeds"):
+      state[name] = state[name].tolist()
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self.bosses = numpy.array(self.bosses, dtype=bool)
+    for name in ("stats", "max_hp", "xp", "name_seeds"):
+      setattr(self, name, numpy.array(getattr(self, name), dtype=numpy.int64))
+
+  @classmethod
+  def roll_stats(cls, count, level, die, modifier, random_state):
+    """Rolls Monster.roll_stat for count monsters at once."""
+    return dice.roll_many(level, die, count, random_state) + level * modifier
+
+  @classmethod
+  def calculate_exp(cls, stats):
+    """Monster.calculate_exp for every row of stats."""
+    effective_level = numpy.zeros(len(stats))
+    # Same order of float operations as Monster.calculate_exp
+    for stat in STAT_DICE:
+      die, modifier = STAT_DICE[stat]
+      average = ((1 + die) / 2.0) + modifier
+      effective_level += stats[:, STAT_ORDER.index(stat)] / average
+    effective_level /= 6
+    return (10 * effective_level).astype(numpy.int64)
+
+  def boss(self, index):
+    return bool(self.bosses[index])
+
+  def stat_dict(self, index):
+    return dict(zip(STAT_ORDER, self.stats[index].tolist()))
+
+  def name(self, index):
+    if self._names[index] is None:
+      name_rng = random.Random(int(self.name_seeds[index]))
+      self._names[index] = Monster.make_name(
+          NAME_GENERATOR.generate_name(name_rng), self.level,
+          self.boss(index))
+    return self._names[index]
+
+  def monster(self, index):
+    """Returns the Monster for row index, building it on first use."""
+    if index not in self._monsters:
+      self._monsters[index] = Monster.from_batch(self, index)
+    return self._monsters[index]
+
+  def release(self, index):
+    """Forgets the Monster built for row index, e.g. once it is defeated."""
+    self._monsters.pop(index, None)
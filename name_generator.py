@@ -1,16 +1,34 @@
 import collections
+import hashlib
+import json
 import random
+import alias
+
+# Bump when the compiled table format changes, to invalidate old caches
+CACHE_VERSION = 1
+# Give up on generating and reuse a corpus name after this many rejections
+MAX_ATTEMPTS = 100
 
 class NameGenerator(object):
-  def __init__(self, filename, shortest=3, longest=100):
-    self.monsters = self.read_monster_list(filename)
-    self.table = self.make_markov_table(self.monsters)
+  def __init__(self, filename, shortest=3, longest=100, cache=True):
     self.shortest = shortest
     self.longest = longest
-
-  def read_monster_list(self, filename):
     with open(filename, "r") as file_in:
-      lines = file_in.readlines()
+      corpus = file_in.read()
+    self.monsters = sorted(self.read_monster_list(corpus.splitlines()))
+    corpus_hash = hashlib.sha1(corpus).hexdigest()
+    cache_filename = filename + ".cache"
+    self.table = None
+    if cache:
+      self.table = self.load_cache(cache_filename, corpus_hash)
+    if self.table is None:
+      counts = self.make_markov_table(self.monsters)
+      self.table = self.compile_table(counts)
+      if cache:
+        self.save_cache(cache_filename, corpus_hash)
+
+  @staticmethod
+  def read_monster_list(lines):
     monsters = []
     for line in lines:
       line = line.lower()
@@ -18,8 +36,9 @@ class NameGenerator(object):
       if len(line) > 2:
         monsters.append(line)
     return set(monsters)
-  
-  def make_markov_table(self, monsters):
+
+  @staticmethod
+  def make_markov_table(monsters):
     table = {}
     for letter in "abcdefghijklmnopqrstuvwxyz ":
       table[letter] = collections.defaultdict(int)
@@ -32,24 +51,46 @@ class NameGenerator(object):
       table[current]["END"] += 1
     return table
 
-  def generate_name(self):
-    # Hacky and inefficient. TODO, maybe
-    name = []
-    current = "START"
-    while current != "END":
-      entry = self.table[current]
-      next_letter = None
-      total = 0
-      for candidate in entry:
-        count = entry[candidate]
-        total += count
-        if random.randint(1, total) <= count:
-          next_letter = candidate
-      if next_letter == "END":
-        if len(name) >= self.shortest and len(name) <= self.longest:
-          return "".join(name).title()
-        else:
-          return self.generate_name()
-      else:
-        name.append(next_letter)
-        current = next_letter
+  @staticmethod
+  def compile_table(counts):
+    table = {}
+    for state in counts:
+      if counts[state]:
+        table[state] = alias.make_table(counts[state])
+    return table
+
+  def load_cache(self, cache_filename, corpus_hash):
+    try:
+      with open(cache_filename, "r") as file_in:
+        cached = json.load(file_in)
+    except (IOError, ValueError):
+      return None
+    if (cached.get("version") != CACHE_VERSION or
+        cached.get("corpus") != corpus_hash):
+      return None
+    return dict((str(state), [[str(symbol) for symbol in symbols],
+                              probability, aliases])
+                for state, (symbols, probability, aliases)
+                in cached["table"].iteritems())
+
+  def save_cache(self, cache_filename, corpus_hash):
+    try:
+      with open(cache_filename, "w") as file_out:
+        json.dump({"version": CACHE_VERSION, "corpus": corpus_hash,
+                   "table": self.table}, file_out)
+    except IOError:
+      pass  # The cache is only an optimization
+
+  def next_letter(self, current, rng):
+    return alias.sample(self.table[current], rng)
+
+  def generate_name(self, rng=random):
+    for _ in xrange(MAX_ATTEMPTS):
+      name = []
+      current = self.next_letter("START", rng)
+      while current != "END" and len(name) <= self.longest:
+        name.append(current)
+        current = self.next_letter(current, rng)
+      if current == "END" and self.shortest <= len(name) <= self.longest:
+        return "".join(name).title()
+    return rng.choice(self.monsters).title()
@@ -0,0 +1,102 @@
+"""Scores equipment for a character, to decide what to keep or recycle.
+
+A piece's score is the change in the character's estimated combat power
+from wearing it instead of what is in its slot now. Power multiplies the
+factors Combat uses, so its log is a sum of:
+  damage:   the attack stat for the weapon's type (Strength or Intellect)
+            to the power .5, average weapon damage and Beefy!/Wizardry
+  turns:    Speed to the power .5, about how the share of turns grows
+  survival: max HP, and Defense and Magic Defense to the power .25 each,
+            since monsters hit with either kind of damage
+so the weight of each stat follows the character's build: a point of a
+stat the character has little of counts for more. Scores are in log units;
+exp(score) - 1 is the relative change in power.
+
+Candidates are scored as Stash columns, so thousands score in one call.
+"""
+import numpy
+from equipment import SLOTS
+from stash import Stash, STAT_COLUMNS, WEAPON_TYPES
+
+STRENGTH, STAMINA, SPEED, INTELLECT, DEFENSE, MAGIC_DEFENSE = range(6)
+TRAIT_BONUS = {"Physical": "Beefy!", "Magic": "Wizardry"}
+
+class Predictor(object):
+  def __init__(self, character):
+    self.character = character
+    self.worn = Stash(len(SLOTS))
+    for piece in character.equipment:
+      self.worn.add(piece)
+    self.impacts = numpy.array([character.get_impact(stat)
+                                for stat in STAT_COLUMNS])
+    totals = numpy.array([character.stats[stat] +
+                          character.equipment_stats[stat]
+                          for stat in STAT_COLUMNS], dtype=float)
+    # Row per slot: the character's stats without the piece in that slot
+    self.without = totals - self.worn.stats[:len(SLOTS)]
+    self.trait_factors = numpy.array(
+        [1.00 + .05 * character.traits[TRAIT_BONUS[weapon_type]]
+         for weapon_type in WEAPON_TYPES])
+    self.current = self.power(self.worn)
+
+  def power(self, stash):
+    """Log combat power if each piece in stash were worn, as an array."""
+    count = len(stash)
+    columns = stash.columns
+    slots = columns["slot"][:count]
+    stats = (self.without[slots] + stash.stats[:count]) * self.impacts
+    stats = numpy.maximum(1.0, stats)
+    # Pieces other than weapons are used with the current weapon
+    worn = self.worn.columns
+    is_weapon = slots == 0
+    low = numpy.where(is_weapon, columns["low"][:count], worn["low"][0])
+    high = numpy.where(is_weapon, columns["high"][:count], worn["high"][0])
+    weapon_type = numpy.where(is_weapon, columns["weapon_type"][:count],
+                              worn["weapon_type"][0])
+    physical = weapon_type == WEAPON_TYPES.index("Physical")
+    attack = numpy.where(physical, stats[:, STRENGTH], stats[:, INTELLECT])
+    damage = numpy.maximum(1.0, (low + high) / 2.0)
+    max_hp = stats[:, STAMINA] * 5 + self.character.base_hp
+    return (.5 * numpy.log(attack) + numpy.log(damage) +
+            numpy.log(self.trait_factors[weapon_type]) +
+            .5 * numpy.log(stats[:, SPEED]) + numpy.log(max_hp) +
+            .25 * numpy.log(stats[:, DEFENSE]) +
+            .25 * numpy.log(stats[:, MAGIC_DEFENSE]))
+
+  def score_stash(self, stash):
+    """Scores every piece in a Stash, returning an array by row."""
+    count = len(stash)
+    return self.power(stash) - self.current[stash.columns["slot"][:count]]
+
+  def score_items(self, items):
+    stash = Stash(max(1, len(items)))
+    for item in items:
+      stash.add(item)
+    return self.score_stash(stash)
+
+  def score(self, item):
+    return float(self.score_items([item])[0])
+
+  def best_in_stash(self, stash, slot=None):
+    """Row of the stashed piece that would help most, or None if nothing in
+    the stash (or slot) is better than what is worn."""
+    scores = self.score_stash(stash)
+    rows = stash.find(slot=slot)
+    if not rows.size:
+      return None
+    best = rows[numpy.argmax(scores[rows])]
+    if scores[best] <= 0:
+      return None
+    return int(best)
+
+  def recommend(self, item):
+    """Returns ("Keep New" or "Keep Current", score)."""
+    score = self.score(item)
+    return ("Keep New" if score > 0 else "Keep Current"), score
+
+  @classmethod
+  def recommendation_text(cls, character, item):
+    choice, score = cls(character).recommend(item)
+    color = "`0,160,0`" if score > 0 else "`255,0,0`"
+    return "%sRecommended: %s (%+.1f%% estimated combat power)`0,0,0`" % (
+        color, choice, 100 * (numpy.exp(score) - 1))
@@ -1,51 +1,82 @@
 import random
-from monster import Monster
+from monster_batch import MonsterBatch
 from equipment import Equipment
 
 TREASURE_CHANCES = [1.0, 1.0, 0.36, 0.06, 0.01]
 
 class Quest(object):
-  def __init__(self, level):
-    self.monsters = []
-    self.treasures = 0
-    for _ in range(random.randint(3, 10)):
-      self.monsters.append(Monster(level, False))
-      self.treasures += 1
-    for _ in range(random.randint(0, 1)):
-      self.monsters.append(Monster(level, True))
-      self.treasures += 5
-    self.gp_reward = 0
-    self.xp_reward = 0
-    self.treasure_reward = 0
+  def __init__(self, level, rng=random):
+    # Only the quest's spec is rolled here. Most quests are never looked at,
+    # so the monsters and rewards are built from the seed on first use.
     self.level = level
+    self.seed = rng.getrandbits(32)
+    self.monster_count = rng.randint(3, 10)
+    self.boss_count = rng.randint(0, 1)
+    self.treasures = self.monster_count + 5 * self.boss_count
+    self.rng = None
+    self._batch = None
+    # Index in the batch of the monster currently being fought
+    self._next_monster = 0
+    self._gp_reward = 0
+    self._xp_reward = 0
+    self._treasure_reward = 0
+
+  def materialize(self):
+    if self._batch is not None:
+      return
+    self.rng = random.Random(self.seed)
+    # Bosses come last
+    bosses = [False] * self.monster_count + [True] * self.boss_count
+    self._batch = MonsterBatch(self.level, bosses, self.rng)
     self.generate_rewards()
 
+  @property
+  def batch(self):
+    self.materialize()
+    return self._batch
+
+  @property
+  def gp_reward(self):
+    self.materialize()
+    return self._gp_reward
+
+  @property
+  def xp_reward(self):
+    self.materialize()
+    return self._xp_reward
+
+  @property
+  def treasure_reward(self):
+    self.materialize()
+    return self._treasure_reward
+
   def complete(self):
-    return len(self.monsters) == 0
+    return self._next_monster >= len(self.batch)
 
   def generate_rewards(self):
-    self.treasure_reward = 1
-    self.gp_reward = 5 * self.level
-    self.xp_reward = 5 * self.level
+    self._treasure_reward = 1
+    self._gp_reward = 5 * self.level
+    self._xp_reward = 5 * self.level
     for _ in xrange(self.treasures):
-      self.xp_reward += random.randint(2 * self.level, 5 * self.level)
-      if random.random() < .3:
-        self.treasure_reward += 1
+      self._xp_reward += self.rng.randint(2 * self.level, 5 * self.level)
+      if self.rng.random() < .3:
+        self._treasure_reward += 1
       else:
-        self.gp_reward += random.randint(2 * self.level, 5 * self.level)
+        self._gp_reward += self.rng.randint(2 * self.level, 5 * self.level)
 
   def get_monster(self):
-    return self.monsters[0]
+    return self.batch.monster(self._next_monster)
 
   def defeat_monster(self):
-    self.monsters.pop(0)
+    self.batch.release(self._next_monster)
+    self._next_monster += 1
 
   def __str__(self):
     pieces = []
     pieces.append("Quest status:")
     pieces.append("Remaining monsters:")
-    for monster in self.monsters:
-      pieces.append(monster.name)
+    for index in xrange(self._next_monster, len(self.batch)):
+      pieces.append(self.batch.name(index))
     pieces.append("Reward: %d GP, %d XP, %d treasures" % (self.gp_reward,
                                                           self.xp_reward,
                                                           self.treasure_reward))
@@ -55,7 +86,8 @@ class Quest(object):
     treasure = []
     while len(treasure) < self.treasure_reward:
       for rarity in range(4, -1, -1):
-        if random.random() < TREASURE_CHANCES[rarity]:
-          treasure.append(Equipment.get_new_armor(self.level, rarity=rarity))
+        if self.rng.random() < TREASURE_CHANCES[rarity]:
+          treasure.append(Equipment.get_new_armor(self.level, rarity=rarity,
+                                                  rng=self.rng))
           break
     return treasure
@@ -0,0 +1,145 @@
+"""Records games as a seed plus their choices, and replays them headlessly.
+
+A journal file is a JSON header line ({"version": 1, "seed": ...}) followed
+by one choice index per line, so it can be appended to as the game is played
+and still be read back after a crash.
+"""
+# pylint: disable=print-statement
+import argparse
+import cProfile
+import json
+import pstats
+import time
+import snapshot
+from game_state import GameState
+
+JOURNAL_VERSION = 1
+# Keep an in-memory snapshot every this many choices
+CHECKPOINT_INTERVAL = 500
+
+class Journal(object):
+  def __init__(self, seed, choices=None):
+    self.seed = seed
+    self.choices = choices or []
+
+  @classmethod
+  def from_game(cls, game_state):
+    return cls(game_state.seed, list(game_state.journal))
+
+  def __len__(self):
+    return len(self.choices)
+
+  def save(self, filename):
+    with open(filename, "w") as file_out:
+      JournalWriter.write_header(file_out, self.seed)
+      for choice in self.choices:
+        file_out.write("%d\n" % choice)
+
+  @classmethod
+  def load(cls, filename):
+    with open(filename, "r") as file_in:
+      try:
+        header = json.loads(file_in.readline())
+      except ValueError:
+        raise ValueError("%s is not a journal" % filename)
+      if header.get("version") != JOURNAL_VERSION:
+        raise ValueError("Unsupported journal version %r" %
+                         header.get("version"))
+      # A partly written last line (from a crash) is dropped
+      choices = []
+      for line in file_in:
+        if line.endswith("\n"):
+          choices.append(int(line))
+    return cls(header["seed"], choices)
+
+class JournalWriter(object):
+  """Appends a game's choices to a journal file as they are made."""
+  def __init__(self, filename, game_state):
+    self.filename = filename
+    self.filehandle = open(filename, "w")
+    self.write_header(self.filehandle, game_state.seed)
+    # A game loaded from a save already has some history
+    for choice in game_state.journal:
+      self.filehandle.write("%d\n" % choice)
+    self.filehandle.flush()
+
+  @staticmethod
+  def write_header(file_out, seed):
+    file_out.write(json.dumps({"version": JOURNAL_VERSION, "seed": seed}))
+    file_out.write("\n")
+
+  def record(self, choice):
+    self.filehandle.write("%d\n" % choice)
+    self.filehandle.flush()
+
+  def close(self):
+    self.filehandle.close()
+
+class Replayer(object):
+  """Replays a journal, able to jump to any choice.
+
+  Snapshots are kept every interval choices, so seeking backwards or far
+  ahead only replays from the nearest earlier checkpoint.
+  """
+  def __init__(self, journal, interval=CHECKPOINT_INTERVAL):
+    self.journal = journal
+    self.interval = interval
+    self.game_state = GameState(journal.seed)
+    # Number of choices from the journal applied to game_state so far
+    self.position = 0
+    self.checkpoints = {0: snapshot.dumps(self.game_state)}
+
+  def step(self):
+    """Applies the next choice, returning its logs."""
+    logs = self.game_state.apply_choice(self.journal.choices[self.position])
+    self.position += 1
+    if (self.position % self.interval == 0 and
+        self.position not in self.checkpoints):
+      self.checkpoints[self.position] = snapshot.dumps(self.game_state)
+    return logs
+
+  def seek(self, position):
+    """Brings game_state to just after the first position choices."""
+    position = max(0, min(position, len(self.journal)))
+    checkpoint = max(point for point in self.checkpoints if point <= position)
+    if position < self.position or checkpoint > self.position:
+      self.game_state = snapshot.loads(self.checkpoints[checkpoint])
+      self.position = checkpoint
+    while self.position < position:
+      self.step()
+    return self.game_state
+
+  def run(self):
+    return self.seek(len(self.journal))
+
+def main():
+  parser = argparse.ArgumentParser(description="Replay an SRS Game journal")
+  parser.add_argument("journal")
+  parser.add_argument("--to", type=int, default=None,
+                      help="Stop after this many choices (default: all)")
+  parser.add_argument("--profile", type=int, default=0,
+                      help="Profile this many choices after --to")
+  parser.add_argument("--save", default=None,
+                      help="Write a snapshot of the resulting game here")
+  args = parser.parse_args()
+  journal = Journal.load(args.journal)
+  replayer = Replayer(journal)
+  target = len(journal) if args.to is None else args.to
+  start = time.time()
+  game_state = replayer.seek(target)
+  elapsed = time.time() - start
+  print "Replayed %d choices in %.2fs" % (replayer.position, elapsed)
+  if args.profile:
+    profiler = cProfile.Profile()
+    profiler.runcall(replayer.seek, replayer.position + args.profile)
+    game_state = replayer.game_state
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+  print "State: %s  Floor: %d  Time: %d" % (game_state.current_state(),
+                                           game_state.floor,
+                                           game_state.time_spent)
+  print game_state.character
+  if args.save:
+    snapshot.save(game_state, args.save)
+
+if __name__ == "__main__":
+  main()
@@ -1,6 +1,7 @@
 import random
 from equipment import Equipment, RARITY
 from effect import WellRested, Blessed
+from predictor import Predictor
 import items
 
 # TODO: Rooms ideas:
@@ -15,13 +16,22 @@ class Room(object):
   ENTER_DUNGEON = 4
   LEVEL_UP = 5
 
-  def __init__(self, level):
+  def __init__(self, level, rng=random):
     self.level = level
+    self.rng = rng
     self.faction_rate = 1.0
+    # Tower update epoch the stock was last built for, None if never built
+    self.refresh_epoch = None
 
   def refresh(self):
     pass
 
+  def check_refresh(self, epoch):
+    """Rebuilds the stock if it was last built before the given epoch."""
+    if self.refresh_epoch != epoch:
+      self.refresh()
+      self.refresh_epoch = epoch
+
   @classmethod
   def get_name(cls):
     return "Unnamed Room"
@@ -39,8 +49,8 @@ class Room(object):
     self.faction_rate = faction_rate
 
 class TrainingRoom(Room):
-  def __init__(self, level):
-    super(TrainingRoom, self).__init__(level)
+  def __init__(self, level, rng=random):
+    super(TrainingRoom, self).__init__(level, rng)
     self.level = level
     self.train_count = 0
 
@@ -100,8 +110,8 @@ class TrainingRoom(Room):
     assert False
 
 class Enchanter(Room):
-  def __init__(self, level):
-    super(Enchanter, self).__init__(level)
+  def __init__(self, level, rng=random):
+    super(Enchanter, self).__init__(level, rng)
     self.level = level
     self.enchanting_armor = False
 
@@ -163,7 +173,8 @@ class Enchanter(Room):
       character.gold -= cost
       character.materials[item.rarity] -= mat_cost
       old_item_string = str(item)
-      enchantment = item.enchant()
+      enchantment = item.enchant(self.rng)
+      character.equipment_changed()
       logs.append("Your %s was enchanted (%s)" % (old_item_string, enchantment))
       return (3, Room.NO_CHANGE)
     else:
@@ -211,8 +222,8 @@ class Enchanter(Room):
     self.faction_rate = faction_rate
 
 class Forge(Room):
-  def __init__(self, level):
-    super(Forge, self).__init__(level)
+  def __init__(self, level, rng=random):
+    super(Forge, self).__init__(level, rng)
     self.level = level
     self.forging_armor = False
 
@@ -291,7 +302,8 @@ class Forge(Room):
       character.gold -= cost
       character.materials[item.rarity] -= mat_cost
       old_item_string = str(item)
-      improvement = item.reforge(self.level)
+      improvement = item.reforge(self.level, self.rng)
+      character.equipment_changed()
       logs.append("Your %s was reforged (%s)" % (old_item_string, improvement))
       return (3, Room.NO_CHANGE)
     else:
@@ -325,8 +337,8 @@ class Forge(Room):
     self.faction_rate = faction_rate
 
 class EquipmentShop(Room):
-  def __init__(self, level, shop_type):
-    self.level = level
+  def __init__(self, level, shop_type, rng=random):
+    super(EquipmentShop, self).__init__(level, rng)
     self.inventory = None
     self.buying = False
     self.shop_choice = None
@@ -380,7 +392,7 @@ class EquipmentShop(Room):
         self.buying = False
         logs.append("Purchased %s for %d gold." % (str(equipment), value))
         logs.append("Recycled %s" % recycle)
-        materials = recycle.get_recycled_materials()
+        materials = recycle.get_recycled_materials(self.rng)
         character.gain_materials(materials)
         logs.append("Received %s" % Equipment.materials_string(materials))
         return (1, Room.NO_CHANGE)
@@ -408,12 +420,11 @@ class EquipmentShop(Room):
     self.faction_rate = faction_rate
 
 class ArmorShop(EquipmentShop):
-  def __init__(self, level):
-    super(ArmorShop, self).__init__(level, "Armor")
-    self.refresh()
+  def __init__(self, level, rng=random):
+    super(ArmorShop, self).__init__(level, "Armor", rng)
 
   def refresh(self):
-    self.inventory = [Equipment.get_new_armor(self.level, slot)
+    self.inventory = [Equipment.get_new_armor(self.level, slot, rng=self.rng)
                       for slot in range(1, 4)]
 
   @classmethod
@@ -421,41 +432,41 @@ class ArmorShop(EquipmentShop):
     return "Armorer"
 
 class WeaponShop(EquipmentShop):
-  def __init__(self, level):
-    super(WeaponShop, self).__init__(level, "Weapon")
-    self.refresh()
+  def __init__(self, level, rng=random):
+    super(WeaponShop, self).__init__(level, "Weapon", rng)
 
   def refresh(self):
-    self.inventory = [Equipment.get_new_armor(self.level, 0) for _ in range(3)]
+    self.inventory = [Equipment.get_new_armor(self.level, 0, rng=self.rng)
+                      for _ in range(3)]
 
   @classmethod
   def get_name(cls):
     return "Weaponsmith"
 
 class Jeweler(EquipmentShop):
-  def __init__(self, level):
-    super(Jeweler, self).__init__(level, "Accessory")
-    self.refresh()
+  def __init__(self, level, rng=random):
+    super(Jeweler, self).__init__(level, "Accessory", rng)
 
   def refresh(self):
-    self.inventory = [Equipment.get_new_armor(self.level, 4) for _ in range(3)]
+    self.inventory = [Equipment.get_new_armor(self.level, 4, rng=self.rng)
+                      for _ in range(3)]
 
   @classmethod
   def get_name(cls):
     return "Jeweler"
 
 class RareGoodsShop(EquipmentShop):
-  def __init__(self, level):
-    super(RareGoodsShop, self).__init__(level, "Equipment")
-    self.refresh()
+  def __init__(self, level, rng=random):
+    super(RareGoodsShop, self).__init__(level, "Equipment", rng)
 
   def refresh(self):
     self.inventory = []
     for _ in range(3):
-      level = max(1, self.level + int(random.gauss(0, 3)))
-      rarity = random.randint(2, 4)
-      slot = random.randint(0, 4)
-      equip = Equipment.get_new_armor(level, slot=slot, rarity=rarity)
+      level = max(1, self.level + int(self.rng.gauss(0, 3)))
+      rarity = self.rng.randint(2, 4)
+      slot = self.rng.randint(0, 4)
+      equip = Equipment.get_new_armor(level, slot=slot, rarity=rarity,
+                                      rng=self.rng)
       self.inventory.append(equip)
 
   @classmethod
@@ -463,12 +474,21 @@ class RareGoodsShop(EquipmentShop):
     return "Rare Goods Shop"
 
 class Inn(Room):
+  # Looking through the character's stash, and the stash row on show. Class
+  # defaults, so Inns from saves made before the stash still load.
+  browsing_stash = False
+  stash_row = 0
+
   @classmethod
   def get_name(cls):
     return "Inn"
 
   def get_buttons(self, character):
-    return ["", "Rest", "Buy Food", "Leave Inn"]
+    if self.browsing_stash:
+      next_piece = "Next Stashed" if len(character.stash) > 1 else ""
+      return [next_piece, "Equip Stashed", "Recycle Stashed", "Never Mind"]
+    stash = "Stash" if len(character.stash) else ""
+    return [stash, "Rest", "Buy Food", "Leave Inn"]
 
   def get_rest_cost(self):
     return int(self.level * 10 * self.faction_rate)
@@ -477,14 +497,64 @@ class Inn(Room):
     return int(self.level * 10 * self.faction_rate)
 
   def get_text(self, character):
+    if self.browsing_stash:
+      equip = character.stash.get(self.stash_row)
+      return "Stashed piece %d of %d\n%s" % (
+          self.stash_row + 1, len(character.stash),
+          Equipment.equipment_comparison_text(character.equipment[equip.slot],
+                                              equip))
     pieces = []
     pieces.append("Rest: (%dg + 30 time) Well Rested buff" %
                   self.get_rest_cost())
     pieces.append("Buy Food: %d gold" % self.get_food_cost())
+    if len(character.stash):
+      pieces.append("Stash: %d pieces of equipment" % len(character.stash))
     return "\n".join(pieces)
 
+  def open_stash(self, character):
+    """Shows the stashed piece that would help most, else the first."""
+    if not len(character.stash):
+      self.browsing_stash = False
+      return
+    self.browsing_stash = True
+    best = Predictor(character).best_in_stash(character.stash)
+    self.stash_row = 0 if best is None else best
+
+  def apply_choice_stash(self, choice_text, logs, character):
+    stash = character.stash
+    if choice_text == "Next Stashed":
+      self.stash_row = (self.stash_row + 1) % len(stash)
+      return (0, Room.NO_CHANGE)
+    elif choice_text == "Equip Stashed":
+      equipment = stash.take(self.stash_row)
+      removed = character.equip(equipment)
+      logs.append("You equip %s" % equipment)
+      if removed is not None:
+        stash.add(removed)
+        logs.append("Stashed %s" % removed)
+      self.open_stash(character)
+      return (1, Room.NO_CHANGE)
+    elif choice_text == "Recycle Stashed":
+      recycle = stash.take(self.stash_row)
+      logs.append("Recycled %s" % recycle)
+      materials = recycle.get_recycled_materials(self.rng)
+      character.gain_materials(materials)
+      logs.append("Received %s" % Equipment.materials_string(materials))
+      if self.stash_row >= len(stash):
+        self.stash_row = 0
+      self.browsing_stash = bool(len(stash))
+      return (0, Room.NO_CHANGE)
+    elif choice_text == "Never Mind":
+      self.browsing_stash = False
+      return (0, Room.NO_CHANGE)
+
   def apply_choice(self, choice_text, logs, character):
-    if choice_text == "Rest":
+    if self.browsing_stash:
+      return self.apply_choice_stash(choice_text, logs, character)
+    if choice_text == "Stash":
+      self.open_stash(character)
+      return (0, Room.NO_CHANGE)
+    elif choice_text == "Rest":
       cost = self.get_rest_cost()
       if cost <= character.gold:
         character.gold -= cost
@@ -513,6 +583,7 @@ class Inn(Room):
       return (0, Room.LEAVE_ROOM)
 
   def enter_shop(self, faction_rate):
+    self.browsing_stash = False
     self.faction_rate = faction_rate
 
 class Temple(Room):
@@ -560,8 +631,8 @@ class Temple(Room):
     self.faction_rate = faction_rate
 
 class Alchemist(Room):
-  def __init__(self, level):
-    super(Alchemist, self).__init__(level)
+  def __init__(self, level, rng=random):
+    super(Alchemist, self).__init__(level, rng)
     self.level = level
     self.faction_rate = 1.0
     self.possible_items = [items.MinorHealthPotion, items.MajorHealthPotion,
@@ -577,11 +648,11 @@ class Alchemist(Room):
                            items.ConcentratePotion,
                            items.MajorConcentratePotion,
                            items.MinorConcentratePotion]
-    self.inventory = self.generate_inventory()
+    self.inventory = None
 
   def item_rate(self, item):
     """Returns a number representing how much it should appear in the shop."""
-    return random.random() / (abs(self.level - item.get_item_level()) + 1)
+    return self.rng.random() / (abs(self.level - item.get_item_level()) + 1)
 
   def generate_inventory(self):
     inventory = []
@@ -645,8 +716,8 @@ class Alchemist(Room):
     self.faction_rate = faction_rate
 
 class Crafthall(Room):
-  def __init__(self, level):
-    super(Crafthall, self).__init__(level)
+  def __init__(self, level, rng=random):
+    super(Crafthall, self).__init__(level, rng)
     self.level = level
     self.faction_rate = 1.0  # Ignored
     self.crafting = False
@@ -679,9 +750,9 @@ class Crafthall(Room):
       return "\n".join(pieces)
 
   @classmethod
-  def get_craft_rarity(cls, starting_rarity):
+  def get_craft_rarity(cls, starting_rarity, rng=random):
     rarity = starting_rarity
-    while random.random() < .1:
+    while rng.random() < .1:
       rarity += 1
     return min(rarity, 4)
 
@@ -692,10 +763,11 @@ class Crafthall(Room):
       character.materials[0] -= self.level
       character.materials[rarity] -= self.level
       character.gold -= 10 * rarity * self.level
-      rarity = self.get_craft_rarity(rarity)
+      rarity = self.get_craft_rarity(rarity, self.rng)
       self.crafting = True
-      level = int(self.level + max(0, random.gauss(0, 1)))
-      self.crafted_piece = Equipment.get_new_armor(level, rarity=rarity)
+      level = int(self.level + max(0, self.rng.gauss(0, 1)))
+      self.crafted_piece = Equipment.get_new_armor(level, rarity=rarity,
+                                                   rng=self.rng)
       return (3, Room.NO_CHANGE)
     else:
       logs.append("You do not have enough money or materials.")
@@ -709,7 +781,7 @@ class Crafthall(Room):
       self.crafted_piece = None
       self.crafting = False
       logs.append("Recycled %s" % recycle)
-      materials = recycle.get_recycled_materials()
+      materials = recycle.get_recycled_materials(self.rng)
       character.gain_materials(materials)
       logs.append("Received %s" % Equipment.materials_string(materials))
       return (0, Room.NO_CHANGE)
@@ -719,7 +791,7 @@ class Crafthall(Room):
       self.crafted_piece = None
       self.crafting = False
       logs.append("Recycled %s" % recycle)
-      materials = recycle.get_recycled_materials()
+      materials = recycle.get_recycled_materials(self.rng)
       character.gain_materials(materials)
       logs.append("Received %s" % Equipment.materials_string(materials))
       return (0, Room.NO_CHANGE)
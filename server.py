@@ -0,0 +1,365 @@
+"""Multi-session game server speaking JSON lines over a local socket.
+
+Python 2 has no asyncio, so the event loop is asyncore/asynchat. The loop
+only does socket I/O. Requests go through a bounded queue to worker threads,
+which take the session's lock before touching its GameState.
+
+Each request is one JSON object per line, and gets one JSON line back with
+the same "id":
+  {"id": 1, "op": "new", "seed": 123}           -> session, choices, panel
+  {"id": 2, "op": "choices", "session": "..."}  -> choices
+  {"id": 3, "op": "apply", "session": "...", "choice": 0}
+                                                -> logs, choices, state
+  {"id": 4, "op": "panel", "session": "..."}    -> panel
+  {"id": 5, "op": "close", "session": "..."}
+  {"id": 6, "op": "metrics"}                    -> metrics (see metrics.py)
+Failures are {"id": ..., "error": "..."}. The error is "busy" when the work
+queue is full; the client should back off and retry.
+"""
+# pylint: disable=print-statement
+import argparse
+import asynchat
+import asyncore
+import json
+import os
+import Queue
+import socket
+import threading
+import time
+import traceback
+import log_events
+import metrics
+import snapshot
+from game_state import GameState
+
+HOST = "127.0.0.1"
+PORT = 8642
+MAX_SESSIONS = 10000
+# Requests waiting for a worker. Beyond this the server answers "busy".
+QUEUE_SIZE = 1024
+WORKERS = 4
+# A connection is not read from while it has this many requests in flight,
+# which pushes back on the client through TCP
+MAX_PENDING = 32
+MAX_LINE = 64 * 1024
+# Sessions idle for this many seconds are kept as snapshots until next used
+PARK_AFTER = 300
+PARK_INTERVAL = 10
+
+class RequestError(Exception):
+  pass
+
+class Session(object):
+  def __init__(self, session_id, game_state):
+    self.session_id = session_id
+    # Held while a worker uses the game, so requests for one session are
+    # applied one at a time even if they come from several connections
+    self.lock = threading.Lock()
+    self.last_used = time.time()
+    self._game_state = game_state
+    self._parked = None
+
+  def game_state(self):
+    """Returns the GameState, unparking it if needed. Hold self.lock."""
+    if self._game_state is None:
+      self._game_state = snapshot.loads(self._parked)
+      self._parked = None
+    self.last_used = time.time()
+    return self._game_state
+
+  def park(self):
+    """Swaps the GameState for its snapshot. Hold self.lock."""
+    if self._game_state is not None:
+      self._parked = snapshot.dumps(self._game_state)
+      self._game_state = None
+
+  def parked(self):
+    return self._game_state is None
+
+class SessionManager(object):
+  def __init__(self, max_sessions=MAX_SESSIONS, park_after=PARK_AFTER):
+    self.max_sessions = max_sessions
+    self.park_after = park_after
+    self.sessions = {}
+    self.lock = threading.Lock()
+
+  def create(self, seed=None):
+    session_id = os.urandom(8).encode("hex")
+    # Building the GameState is the slow part, so do it outside the lock
+    session = Session(session_id, GameState(seed))
+    with self.lock:
+      if len(self.sessions) >= self.max_sessions:
+        raise RequestError("too many sessions")
+      self.sessions[session_id] = session
+    return session
+
+  def get(self, session_id):
+    with self.lock:
+      session = self.sessions.get(session_id)
+    if session is None:
+      raise RequestError("unknown session")
+    return session
+
+  def close(self, session_id):
+    with self.lock:
+      if self.sessions.pop(session_id, None) is None:
+        raise RequestError("unknown session")
+
+  def park_idle(self, now=None):
+    """Parks sessions that have been idle too long. Returns how many."""
+    now = time.time() if now is None else now
+    with self.lock:
+      sessions = self.sessions.values()
+    parked = 0
+    for session in sessions:
+      if session.parked() or now - session.last_used < self.park_after:
+        continue
+      # Skip sessions a worker is using right now
+      if session.lock.acquire(False):
+        try:
+          session.park()
+          parked += 1
+        finally:
+          session.lock.release()
+    return parked
+
+def op_new(manager, request):
+  session = manager.create(request.get("seed"))
+  with session.lock:
+    game_state = session.game_state()
+    return {"session": session.session_id,
+            "seed": game_state.seed,
+            "choices": game_state.get_choices(),
+            "panel": game_state.panel_text()}
+
+def op_choices(manager, request):
+  session = manager.get(request.get("session"))
+  with session.lock:
+    return {"choices": session.game_state().get_choices()}
+
+def op_apply(manager, request):
+  session = manager.get(request.get("session"))
+  choice = request.get("choice")
+  with session.lock:
+    game_state = session.game_state()
+    choices = game_state.get_choices()
+    if (not isinstance(choice, int) or isinstance(choice, bool) or
+        not 0 <= choice < len(choices) or not choices[choice]):
+      raise RequestError("invalid choice")
+    logs = game_state.apply_choice(choice)
+    return {"logs": log_events.texts(logs),
+            "choices": game_state.get_choices(),
+            "state": game_state.current_state()}
+
+def op_panel(manager, request):
+  session = manager.get(request.get("session"))
+  with session.lock:
+    return {"panel": session.game_state().panel_text()}
+
+def op_close(manager, request):
+  manager.close(request.get("session"))
+  return {}
+
+def op_metrics(manager, request):  # pylint: disable=unused-argument
+  return {"metrics": metrics.registry.snapshot()}
+
+OPS = {"new": op_new,
+       "choices": op_choices,
+       "apply": op_apply,
+       "panel": op_panel,
+       "close": op_close,
+       "metrics": op_metrics}
+
+def handle_request(manager, request):
+  try:
+    if not isinstance(request, dict) or request.get("op") not in OPS:
+      raise RequestError("unknown op")
+    response = OPS[request["op"]](manager, request)
+  except RequestError as error:
+    response = {"error": str(error)}
+  except Exception:  # pylint: disable=broad-except
+    # A bug in the game should not take down the server
+    traceback.print_exc()
+    response = {"error": "internal error"}
+  if isinstance(request, dict) and "id" in request:
+    response["id"] = request["id"]
+  return response
+
+class Channel(asynchat.async_chat):
+  """One client connection."""
+  def __init__(self, sock, server):
+    asynchat.async_chat.__init__(self, sock, map=server.socket_map)
+    self.server = server
+    self.buffer = []
+    self.buffered = 0
+    # Requests submitted to the workers and not yet answered
+    self.pending = 0
+    self.set_terminator("\n")
+
+  def readable(self):
+    return (self.pending < MAX_PENDING and
+            asynchat.async_chat.readable(self))
+
+  def collect_incoming_data(self, data):
+    self.buffered += len(data)
+    if self.buffered > MAX_LINE:
+      self.close()
+      return
+    self.buffer.append(data)
+
+  def found_terminator(self):
+    line = "".join(self.buffer)
+    self.buffer = []
+    self.buffered = 0
+    if not line.strip():
+      return
+    try:
+      request = json.loads(line)
+    except ValueError:
+      self.send_response({"error": "bad json"})
+      return
+    self.server.submit(self, request)
+
+  def send_response(self, response):
+    self.push(json.dumps(response) + "\n")
+
+class Waker(asyncore.dispatcher):
+  """Wakes the event loop when workers have responses ready."""
+  def __init__(self, server):
+    self.reader, self.writer = socket.socketpair()
+    asyncore.dispatcher.__init__(self, self.reader, map=server.socket_map)
+    self.server = server
+
+  def wake(self):
+    try:
+      self.writer.send("x")
+    except socket.error:
+      pass  # The buffer is full, so a wake up is already on its way
+
+  def writable(self):
+    return False
+
+  def handle_read(self):
+    self.recv(4096)
+    self.server.send_responses()
+
+  def close(self):
+    asyncore.dispatcher.close(self)
+    self.writer.close()
+
+class GameServer(asyncore.dispatcher):
+  def __init__(self, host=HOST, port=PORT, workers=WORKERS,
+               queue_size=QUEUE_SIZE, manager=None):
+    self.socket_map = {}
+    asyncore.dispatcher.__init__(self, map=self.socket_map)
+    self.manager = manager or SessionManager()
+    self.requests = Queue.Queue(queue_size)
+    self.responses = Queue.Queue()
+    self.waker = Waker(self)
+    self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+    self.set_reuse_addr()
+    self.bind((host, port))
+    self.listen(128)
+    self.address = self.socket.getsockname()
+    self.running = False
+    self.busy_count = 0
+    self.workers = []
+    for _ in xrange(workers):
+      worker = threading.Thread(target=self.work)
+      worker.daemon = True
+      worker.start()
+      self.workers.append(worker)
+
+  def handle_accept(self):
+    pair = self.accept()
+    if pair is not None:
+      Channel(pair[0], self)
+
+  def submit(self, channel, request):
+    try:
+      self.requests.put_nowait((channel, request))
+    except Queue.Full:
+      self.busy_count += 1
+      response = {"error": "busy"}
+      if isinstance(request, dict) and "id" in request:
+        response["id"] = request["id"]
+      channel.send_response(response)
+      return
+    channel.pending += 1
+
+  def work(self):
+    while True:
+      job = self.requests.get()
+      if job is None:
+        return
+      channel, request = job
+      self.responses.put((channel, handle_request(self.manager, request)))
+      self.waker.wake()
+
+  def send_responses(self):
+    # Runs in the event loop thread, the only one allowed to touch sockets
+    while True:
+      try:
+        channel, response = self.responses.get_nowait()
+      except Queue.Empty:
+        return
+      channel.pending -= 1
+      if channel.connected:
+        channel.send_response(response)
+
+  def serve_forever(self):
+    self.running = True
+    last_park = time.time()
+    while self.running:
+      asyncore.loop(timeout=0.5, use_poll=True, map=self.socket_map, count=1)
+      if time.time() - last_park > PARK_INTERVAL:
+        self.manager.park_idle()
+        last_park = time.time()
+    self.stop_workers()
+    asyncore.close_all(self.socket_map)
+
+  def stop_workers(self):
+    # Only the event loop submits requests, and it has stopped, so once the
+    # unanswered requests are dropped there is room for every worker's None
+    # (or a worker taking one makes room for the next).
+    while True:
+      try:
+        self.requests.get_nowait()
+      except Queue.Empty:
+        break
+    for _ in self.workers:
+      self.requests.put(None)
+    for worker in self.workers:
+      worker.join()
+
+  def stop(self):
+    """Stops serve_forever. Safe to call from any thread; serve_forever
+    returns once the workers have finished their requests."""
+    self.running = False
+    self.waker.wake()
+
+def main():
+  parser = argparse.ArgumentParser(description="SRS Game session server")
+  parser.add_argument("--host", default=HOST)
+  parser.add_argument("--port", type=int, default=PORT)
+  parser.add_argument("--workers", type=int, default=WORKERS)
+  parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+  parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+  parser.add_argument("--metrics-file", default=None,
+                      help="Dump metrics as JSON to this file periodically")
+  parser.add_argument("--metrics-interval", type=float,
+                      default=metrics.DUMP_INTERVAL)
+  args = parser.parse_args()
+  if args.metrics_file:
+    metrics.registry.start_dumping(args.metrics_file, args.metrics_interval)
+  server = GameServer(args.host, args.port, args.workers, args.queue_size,
+                      SessionManager(args.max_sessions))
+  print "Serving on %s:%d" % server.address
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  metrics.registry.stop_dumping()
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,191 @@
+"""Headless batch simulation of full games, driving GameState without wx."""
+# pylint: disable=print-statement
+import argparse
+import multiprocessing
+import random
+import time
+import traceback
+from game_state import GameState
+from predictor import Predictor
+from replay import Journal
+
+# Stop a game after this many choices if it has not reached VICTORY
+MAX_CHOICES = 20000
+
+class Policy(object):
+  """Chooses which of the four buttons to press for a GameState."""
+  def __init__(self, seed=None):
+    self.rng = random.Random(seed)
+
+  def choose(self, game_state, choices):
+    """Returns the index of a non-empty entry in choices."""
+    raise NotImplementedError
+
+  def random_choice(self, choices):
+    options = [i for i, text in enumerate(choices) if text]
+    return self.rng.choice(options)
+
+class RandomPolicy(Policy):
+  def choose(self, game_state, choices):
+    return self.random_choice(choices)
+
+class ScriptedPolicy(Policy):
+  # For each state, the preferred choice texts in order. Anything not covered
+  # falls back to a random non-empty choice.
+  PREFERENCES = {"CHAR_CREATE": ["Strength"],
+                 "TOWN": ["Leave Town"],
+                 "OUTSIDE": ["Ascend Tower", "Town"],
+                 "TOWER": ["Explore"],
+                 "SUMMIT": ["Stronghold of the Ten"],
+                 "STRONGHOLD": ["Enter Room"],
+                 "DUNGEON": ["Leave Dungeon"],
+                 "RUNE_WORLD": ["Leave Rune"],
+                 "COMBAT": ["Attack"],
+                 "USE_ITEM": ["Never Mind"],
+                 "USE_SKILL": ["Never Mind"],
+                 "ACCEPT_QUEST": ["Decline Quest"],
+                 "QUEST": ["Leave Quest"],
+                 "SHOP": ["Keep Current", "Never Mind", "Leave Shop",
+                          "Leave Inn", "Leave Temple"]}
+
+  def choose(self, game_state, choices):
+    for preference in self.PREFERENCES.get(game_state.current_state(), []):
+      if preference in choices:
+        return choices.index(preference)
+    return self.random_choice(choices)
+
+class ClimberPolicy(ScriptedPolicy):
+  """Climbs the tower as fast as it can, retreating when HP gets low."""
+  def __init__(self, seed=None, retreat_hp=0.3):
+    super(ClimberPolicy, self).__init__(seed)
+    self.retreat_hp = retreat_hp
+
+  def choose(self, game_state, choices):
+    state = game_state.current_state()
+    character = game_state.character
+    hp_fraction = float(character.current_hp) / character.max_hp
+    if state == "TOWER" and hp_fraction < self.retreat_hp:
+      return choices.index("Leave Tower")
+    if state == "STRONGHOLD" and hp_fraction < self.retreat_hp:
+      return choices.index("Rest")
+    if state == "LOOT_EQUIPMENT":
+      choice, _ = Predictor(character).recommend(game_state.equipment_choice)
+      return choices.index(choice)
+    return super(ClimberPolicy, self).choose(game_state, choices)
+
+POLICIES = {"random": RandomPolicy,
+            "scripted": ScriptedPolicy,
+            "climber": ClimberPolicy}
+
+def play_game(policy, max_choices=MAX_CHOICES, seed=None):
+  """Plays one game headlessly and returns a dictionary describing it."""
+  start = time.time()
+  game_state = GameState(seed, keep_logs=False)
+  choice_count = 0
+  error = None
+  try:
+    while (choice_count < max_choices and
+           game_state.current_state() != "VICTORY"):
+      choices = game_state.get_choices()
+      game_state.apply_choice(policy.choose(game_state, choices))
+      choice_count += 1
+  except Exception:  # pylint: disable=broad-except
+    # A crash is a result worth reporting, not a reason to lose the batch
+    error = traceback.format_exc()
+  return {"choices": choice_count,
+          "seconds": time.time() - start,
+          "victory": game_state.current_state() == "VICTORY",
+          "time_spent": game_state.time_spent,
+          "frontier": game_state.frontier,
+          "level": game_state.character.level,
+          "state": game_state.current_state(),
+          "seed": game_state.seed,
+          "error": error,
+          # Enough to reproduce the crash with replay.py
+          "journal": game_state.journal if error else None}
+
+def _play_one(args):
+  policy_name, seed, max_choices = args
+  policy = POLICIES[policy_name](seed)
+  return play_game(policy, max_choices, seed)
+
+def run_batch(games, policy_name="climber", processes=None, seed=0,
+              max_choices=MAX_CHOICES):
+  """Plays games in a process pool, returning (results, wall clock seconds)."""
+  jobs = [(policy_name, seed + i, max_choices) for i in xrange(games)]
+  start = time.time()
+  pool = multiprocessing.Pool(processes)
+  try:
+    # Small chunks keep long games from starving the other workers
+    results = list(pool.imap_unordered(_play_one, jobs, chunksize=4))
+  finally:
+    pool.close()
+    pool.join()
+  return results, time.time() - start
+
+def percentile(sorted_values, fraction):
+  if not sorted_values:
+    return 0
+  index = int(round(fraction * (len(sorted_values) - 1)))
+  return sorted_values[index]
+
+def summarize(results, elapsed):
+  games = len(results)
+  choices = sum(result["choices"] for result in results)
+  victory_times = sorted(result["time_spent"] for result in results
+                         if result["victory"])
+  frontiers = sorted(result["frontier"] for result in results)
+  summary = {"games": games,
+             "choices": choices,
+             "elapsed": elapsed,
+             "games_per_second": games / elapsed if elapsed else 0.0,
+             "choices_per_second": choices / elapsed if elapsed else 0.0,
+             "victories": len(victory_times),
+             "errors": sum(1 for result in results if result["error"]),
+             "victory_time": {},
+             "frontier": {}}
+  for name, values in (("victory_time", victory_times),
+                       ("frontier", frontiers)):
+    for label, fraction in (("min", 0.0), ("p10", 0.1), ("p50", 0.5),
+                            ("p90", 0.9), ("max", 1.0)):
+      summary[name][label] = percentile(values, fraction)
+  return summary
+
+def format_summary(summary):
+  pieces = []
+  pieces.append("Games: %d in %.2fs (%.1f games/sec)" %
+                (summary["games"], summary["elapsed"],
+                 summary["games_per_second"]))
+  pieces.append("Choices: %d (%.1f choices/sec)" %
+                (summary["choices"], summary["choices_per_second"]))
+  pieces.append("Victories: %d  Errors: %d" % (summary["victories"],
+                                               summary["errors"]))
+  for name in ("victory_time", "frontier"):
+    distribution = summary[name]
+    pieces.append("%s: min %d / p10 %d / p50 %d / p90 %d / max %d" %
+                  (name, distribution["min"], distribution["p10"],
+                   distribution["p50"], distribution["p90"],
+                   distribution["max"]))
+  return "\n".join(pieces)
+
+def main():
+  parser = argparse.ArgumentParser(description="Headless SRS Game batches")
+  parser.add_argument("--games", type=int, default=100)
+  parser.add_argument("--policy", choices=sorted(POLICIES), default="climber")
+  parser.add_argument("--processes", type=int, default=None)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--max-choices", type=int, default=MAX_CHOICES)
+  args = parser.parse_args()
+  results, elapsed = run_batch(args.games, args.policy, args.processes,
+                               args.seed, args.max_choices)
+  print format_summary(summarize(results, elapsed))
+  for result in results:
+    if result["error"]:
+      print result["error"]
+      filename = "crash_%d.journal" % result["seed"]
+      Journal(result["seed"], result["journal"]).save(filename)
+      print "Journal saved to %s" % filename
+      break
+
+if __name__ == "__main__":
+  main()
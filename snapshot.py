@@ -0,0 +1,454 @@
+"""Compact, versioned binary snapshots of a GameState (or any game object).
+
+A snapshot is the magic bytes "SRSS", a two byte big-endian format version,
+and then a zlib-compressed stream of tagged values:
+  - small ints and references to the first 128 strings are a single byte
+  - other ints of any size are zigzag varints, floats are 8 byte doubles
+  - each distinct string is written once and later referred to by index
+  - lists holding nothing but strings and numbers, and the string and number
+    items of dicts, are written as one block of marshal data, which is much
+    faster to read and write than tagging them one by one
+  - lists, dicts, sets, Randoms and objects are written once and later
+    referred to by index, so shared references (the GameState's rng, the
+    Alchemist's item classes) stay shared and cycles are fine
+  - objects are their class name plus __dict__ (or __getstate__), and are
+    rebuilt without calling __init__ (honouring __setstate__)
+"""
+import collections
+import marshal
+import random
+import struct
+import zlib
+
+MAGIC = "SRSS"
+# Bump when the encoding changes. Older snapshots should keep loading.
+VERSION = 1
+HEADER = struct.Struct(">4sH")
+DOUBLE = struct.Struct(">d")
+# Random.getstate() is 624 words of Mersenne Twister state plus a position
+RANDOM_STATE = struct.Struct(">625I")
+
+# Only classes from these modules are rebuilt on load, so a snapshot can not
+# be used to construct anything other than game objects.
+MODULES = ["character", "combat", "effect", "equipment", "game_state",
+           "items", "monster", "monster_batch", "quest", "rooms", "skills",
+           "stash"]
+# Builtin types that may appear as values, e.g. defaultdict(int) factories
+BUILTINS = {"int": int, "long": long, "float": float, "str": str,
+            "list": list, "dict": dict, "set": set}
+# Modules that may appear as values. The random module is the default rng.
+VALUE_MODULES = {"random": random}
+
+(NONE, TRUE, FALSE, INT, FLOAT, STR, STR_REF, UNICODE, TUPLE, LIST, DICT, SET,
+ DEFAULTDICT, OBJECT, CLASS, MODULE, RANDOM, REF, PLAIN_LIST) = range(19)
+# Types that are written with marshal
+PLAIN_TYPES = frozenset([type(None), bool, int, long, float, str, unicode])
+MARSHAL_VERSION = 2
+# Tags from SMALL_INT up to SHORT_STR_REF are the ints from SMALL_INT_MIN up,
+# and tags from SHORT_STR_REF up are references to strings 0 to 127.
+SMALL_INT = 32
+SHORT_STR_REF = 128
+SMALL_INT_MIN = -16
+SMALL_INT_MAX = SMALL_INT_MIN + (SHORT_STR_REF - SMALL_INT) - 1
+SHORT_STRINGS = 256 - SHORT_STR_REF
+BYTES = [chr(i) for i in xrange(256)]
+
+class Encoder(object):
+  def __init__(self):
+    self.out = []
+    self.strings = {}
+    # id(value) -> memo index. Memoized values are also kept alive in
+    # self.memoized, so that temporary __getstate__ results can not have
+    # their ids reused.
+    self.memo = {}
+    self.memoized = []
+    self.dispatch = {type(None): self.write_none,
+                     bool: self.write_bool,
+                     int: self.write_int,
+                     long: self.write_int,
+                     float: self.write_float,
+                     unicode: self.write_unicode,
+                     tuple: self.write_tuple,
+                     list: self.write_list,
+                     dict: self.write_dict,
+                     set: self.write_set,
+                     collections.defaultdict: self.write_defaultdict,
+                     random.Random: self.write_random,
+                     type: self.write_class,
+                     type(random): self.write_module}
+
+  def encode(self, value):
+    self.write(value)
+    return "".join(self.out)
+
+  def write(self, value):
+    value_type = type(value)
+    # Strings and small ints are most of a GameState, and never memoized
+    if value_type is str:
+      self.write_str(value)
+      return
+    if value_type is int and SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+      self.out.append(BYTES[SMALL_INT + value - SMALL_INT_MIN])
+      return
+    index = self.memo.get(id(value))
+    if index is not None:
+      self.out.append(BYTES[REF])
+      self.write_varint(index)
+      return
+    writer = self.dispatch.get(value_type)
+    if writer is None:
+      self.write_object(value)
+    else:
+      writer(value)
+
+  def remember(self, value):
+    self.memo[id(value)] = len(self.memoized)
+    self.memoized.append(value)
+
+  def write_varint(self, number):
+    if number < 0x80:
+      self.out.append(BYTES[number])
+      return
+    pieces = []
+    while number > 0x7f:
+      pieces.append(BYTES[0x80 | (number & 0x7f)])
+      number >>= 7
+    pieces.append(BYTES[number])
+    self.out.append("".join(pieces))
+
+  def write_none(self, value):  # pylint: disable=unused-argument
+    self.out.append(BYTES[NONE])
+
+  def write_bool(self, value):
+    self.out.append(BYTES[TRUE] if value else BYTES[FALSE])
+
+  def write_int(self, value):
+    self.out.append(BYTES[INT])
+    # Zigzag, so negative numbers stay small
+    self.write_varint(value * 2 if value >= 0 else -value * 2 - 1)
+
+  def write_float(self, value):
+    self.out.append(BYTES[FLOAT])
+    self.out.append(DOUBLE.pack(value))
+
+  def write_str(self, value):
+    index = self.strings.get(value)
+    if index is None:
+      self.strings[value] = len(self.strings)
+      self.out.append(BYTES[STR])
+      self.write_varint(len(value))
+      self.out.append(value)
+    elif index < SHORT_STRINGS:
+      self.out.append(BYTES[SHORT_STR_REF + index])
+    else:
+      self.out.append(BYTES[STR_REF])
+      self.write_varint(index)
+
+  def write_unicode(self, value):
+    encoded = value.encode("utf-8")
+    self.out.append(BYTES[UNICODE])
+    self.write_varint(len(encoded))
+    self.out.append(encoded)
+
+  def write_items(self, values):
+    self.write_varint(len(values))
+    write = self.write
+    for item in values:
+      write(item)
+
+  def write_tuple(self, value):
+    # Tuples are not memoized, they are small and can not be cyclic
+    self.out.append(BYTES[TUPLE])
+    self.write_items(value)
+
+  def write_marshal(self, value):
+    data = marshal.dumps(value, MARSHAL_VERSION)
+    self.write_varint(len(data))
+    self.out.append(data)
+
+  def write_list(self, value):
+    # map and issuperset run in C, so this check is cheap
+    if PLAIN_TYPES.issuperset(map(type, value)):
+      self.out.append(BYTES[PLAIN_LIST])
+      self.remember(value)
+      self.write_marshal(value)
+      return
+    self.out.append(BYTES[LIST])
+    self.remember(value)
+    self.write_items(value)
+
+  def write_set(self, value):
+    self.out.append(BYTES[SET])
+    self.remember(value)
+    self.write_items(list(value))
+
+  def write_dict_items(self, value):
+    # The plain items in one marshal block, then the rest one by one
+    plain = {}
+    rest = []
+    for key, item in value.iteritems():
+      if type(item) in PLAIN_TYPES and type(key) in PLAIN_TYPES:
+        plain[key] = item
+      else:
+        rest.append((key, item))
+    self.write_marshal(plain)
+    self.write_varint(len(rest))
+    write = self.write
+    for key, item in rest:
+      write(key)
+      write(item)
+
+  def write_dict(self, value):
+    self.out.append(BYTES[DICT])
+    self.remember(value)
+    self.write_dict_items(value)
+
+  def write_defaultdict(self, value):
+    self.out.append(BYTES[DEFAULTDICT])
+    self.write(value.default_factory)
+    self.remember(value)
+    self.write_dict_items(value)
+
+  def write_random(self, value):
+    self.out.append(BYTES[RANDOM])
+    self.remember(value)
+    version, internal, gauss_next = value.getstate()
+    self.write(version)
+    self.out.append(RANDOM_STATE.pack(*internal))
+    self.write(gauss_next)
+
+  def write_class(self, value):
+    self.out.append(BYTES[CLASS])
+    self.remember(value)
+    self.write_str(value.__module__)
+    self.write_str(value.__name__)
+
+  def write_module(self, value):
+    self.out.append(BYTES[MODULE])
+    self.write_str(value.__name__)
+
+  def write_object(self, value):
+    self.out.append(BYTES[OBJECT])
+    self.write(type(value))
+    self.remember(value)
+    if hasattr(value, "__getstate__"):
+      self.write(value.__getstate__())
+    else:
+      self.write(value.__dict__)
+
+class Decoder(object):
+  def __init__(self, data):
+    self.data = data
+    self.position = 0
+    self.strings = []
+    self.memo = []
+    self.dispatch = {NONE: self.read_none,
+                     TRUE: self.read_true,
+                     FALSE: self.read_false,
+                     INT: self.read_int,
+                     FLOAT: self.read_float,
+                     STR: self.read_str,
+                     STR_REF: self.read_str_ref,
+                     UNICODE: self.read_unicode,
+                     TUPLE: self.read_tuple,
+                     LIST: self.read_list,
+                     DICT: self.read_dict,
+                     SET: self.read_set,
+                     DEFAULTDICT: self.read_defaultdict,
+                     OBJECT: self.read_object,
+                     CLASS: self.read_class,
+                     MODULE: self.read_module,
+                     RANDOM: self.read_random,
+                     REF: self.read_ref,
+                     PLAIN_LIST: self.read_plain_list}
+
+  def decode(self):
+    value = self.read()
+    if self.position != len(self.data):
+      raise ValueError("Trailing data in snapshot")
+    return value
+
+  def read(self):
+    tag = ord(self.data[self.position])
+    self.position += 1
+    if tag >= SHORT_STR_REF:
+      return self.strings[tag - SHORT_STR_REF]
+    if tag >= SMALL_INT:
+      return tag - SMALL_INT + SMALL_INT_MIN
+    try:
+      reader = self.dispatch[tag]
+    except KeyError:
+      raise ValueError("Unknown snapshot tag %d" % tag)
+    return reader()
+
+  def read_varint(self):
+    data = self.data
+    number = ord(data[self.position])
+    self.position += 1
+    if number < 0x80:
+      return number
+    number &= 0x7f
+    shift = 7
+    while True:
+      byte = ord(data[self.position])
+      self.position += 1
+      number |= (byte & 0x7f) << shift
+      if byte < 0x80:
+        return number
+      shift += 7
+
+  def read_bytes(self, length):
+    start = self.position
+    self.position += length
+    if self.position > len(self.data):
+      raise ValueError("Truncated snapshot")
+    return self.data[start:self.position]
+
+  def read_none(self):
+    return None
+
+  def read_true(self):
+    return True
+
+  def read_false(self):
+    return False
+
+  def read_int(self):
+    number = self.read_varint()
+    return number >> 1 if not number & 1 else -((number + 1) >> 1)
+
+  def read_float(self):
+    return DOUBLE.unpack(self.read_bytes(DOUBLE.size))[0]
+
+  def read_str(self):
+    value = self.read_bytes(self.read_varint())
+    self.strings.append(value)
+    return value
+
+  def read_str_ref(self):
+    return self.strings[self.read_varint()]
+
+  def read_unicode(self):
+    return self.read_bytes(self.read_varint()).decode("utf-8")
+
+  def read_items(self):
+    read = self.read
+    return [read() for _ in xrange(self.read_varint())]
+
+  def read_marshal(self):
+    return marshal.loads(self.read_bytes(self.read_varint()))
+
+  def read_plain_list(self):
+    value = self.read_marshal()
+    self.memo.append(value)
+    return value
+
+  def read_tuple(self):
+    return tuple(self.read_items())
+
+  def read_list(self):
+    value = []
+    self.memo.append(value)
+    value.extend(self.read_items())
+    return value
+
+  def read_set(self):
+    value = set()
+    self.memo.append(value)
+    value.update(self.read_items())
+    return value
+
+  def read_dict_items(self, value):
+    value.update(self.read_marshal())
+    read = self.read
+    for _ in xrange(self.read_varint()):
+      key = read()
+      value[key] = read()
+    return value
+
+  def read_dict(self):
+    value = {}
+    self.memo.append(value)
+    return self.read_dict_items(value)
+
+  def read_defaultdict(self):
+    value = collections.defaultdict(self.read())
+    self.memo.append(value)
+    return self.read_dict_items(value)
+
+  def read_random(self):
+    # Seeded only to skip reading os.urandom, setstate replaces it
+    value = random.Random(0)
+    self.memo.append(value)
+    version = self.read()
+    internal = RANDOM_STATE.unpack(self.read_bytes(RANDOM_STATE.size))
+    value.setstate((version, internal, self.read()))
+    return value
+
+  def read_class(self):
+    module_name = self.read()
+    name = self.read()
+    if module_name == "__builtin__" and name in BUILTINS:
+      value = BUILTINS[name]
+    elif module_name in MODULES:
+      value = getattr(__import__(module_name), name, None)
+    else:
+      value = None
+    if not isinstance(value, type):
+      raise ValueError("Snapshot refers to %s.%s" % (module_name, name))
+    self.memo.append(value)
+    return value
+
+  def read_module(self):
+    name = self.read()
+    if name not in VALUE_MODULES:
+      raise ValueError("Snapshot refers to module %s" % name)
+    return VALUE_MODULES[name]
+
+  def read_object(self):
+    cls = self.read()
+    if not isinstance(cls, type):
+      raise ValueError("Snapshot object without a class")
+    value = cls.__new__(cls)
+    self.memo.append(value)
+    state = self.read()
+    if hasattr(value, "__setstate__"):
+      value.__setstate__(state)
+    else:
+      value.__dict__.update(state)
+    return value
+
+  def read_ref(self):
+    return self.memo[self.read_varint()]
+
+def dumps(value):
+  """Returns the snapshot of value as a string."""
+  payload = zlib.compress(Encoder().encode(value))
+  return HEADER.pack(MAGIC, VERSION) + payload
+
+def loads(data):
+  """Rebuilds a value from a string returned by dumps."""
+  if len(data) < HEADER.size:
+    raise ValueError("Not a snapshot")
+  magic, version = HEADER.unpack(data[:HEADER.size])
+  if magic != MAGIC:
+    raise ValueError("Not a snapshot")
+  if version > VERSION:
+    raise ValueError("Snapshot version %d is newer than %d" % (version,
+                                                                VERSION))
+  try:
+    payload = zlib.decompress(data[HEADER.size:])
+  except zlib.error:
+    raise ValueError("Corrupt snapshot")
+  try:
+    return Decoder(payload).decode()
+  except (IndexError, EOFError, TypeError):
+    raise ValueError("Corrupt snapshot")
+
+def save(value, filename):
+  with open(filename, "wb") as file_out:
+    file_out.write(dumps(value))
+
+def load(filename):
+  with open(filename, "rb") as file_in:
+    return loads(file_in.read())
@@ -0,0 +1,165 @@
+"""Compact storage for large numbers of Equipment pieces, using NumPy.
+
+Each attribute is a column (an array with one row per piece) instead of an
+Equipment object with an attributes dict, so tens of thousands of pieces
+take a few bytes each. Queries like "best Strength helm at or above level
+20" are answered with array operations over the columns.
+
+Rows are not stable: taking a piece out moves the last row into its place.
+"""
+import collections
+import numpy
+from equipment import Equipment, STATS, DEFENSES, SLOTS
+
+# Columns of the stats matrix
+STAT_COLUMNS = STATS + DEFENSES
+WEAPON_TYPES = ["Physical", "Magic"]
+INITIAL_CAPACITY = 64
+
+# Column name -> dtype
+COLUMNS = collections.OrderedDict([("level", numpy.int32),
+                                   ("slot", numpy.int8),
+                                   ("rarity", numpy.int8),
+                                   ("low", numpy.int32),
+                                   ("high", numpy.int32),
+                                   # Index in WEAPON_TYPES, -1 if no weapon
+                                   ("weapon_type", numpy.int8),
+                                   ("enchant_count", numpy.int16),
+                                   ("reforge_count", numpy.int16)])
+
+class Stash(object):
+  def __init__(self, capacity=INITIAL_CAPACITY):
+    self.count = 0
+    self.columns = dict((name, numpy.zeros(capacity, dtype=dtype))
+                        for name, dtype in COLUMNS.iteritems())
+    self.stats = numpy.zeros((capacity, len(STAT_COLUMNS)), dtype=numpy.int32)
+
+  def __len__(self):
+    return self.count
+
+  def __getstate__(self):
+    # Only the used rows are saved, as lists so snapshots can store them
+    state = {"count": self.count,
+             "stats": self.stats[:self.count].tolist()}
+    for name in COLUMNS:
+      state[name] = self.columns[name][:self.count].tolist()
+    return state
+
+  def __setstate__(self, state):
+    self.count = state["count"]
+    capacity = max(INITIAL_CAPACITY, self.count)
+    self.columns = {}
+    for name, dtype in COLUMNS.iteritems():
+      self.columns[name] = numpy.zeros(capacity, dtype=dtype)
+      self.columns[name][:self.count] = state[name]
+    self.stats = numpy.zeros((capacity, len(STAT_COLUMNS)), dtype=numpy.int32)
+    if self.count:
+      self.stats[:self.count] = state["stats"]
+
+  def capacity(self):
+    return len(self.stats)
+
+  def grow(self):
+    capacity = 2 * self.capacity()
+    for name in COLUMNS:
+      column = numpy.zeros(capacity, dtype=COLUMNS[name])
+      column[:self.count] = self.columns[name][:self.count]
+      self.columns[name] = column
+    stats = numpy.zeros((capacity, len(STAT_COLUMNS)), dtype=numpy.int32)
+    stats[:self.count] = self.stats[:self.count]
+    self.stats = stats
+
+  def add(self, equipment):
+    """Stores a piece of equipment, returning its row."""
+    if self.count == self.capacity():
+      self.grow()
+    row = self.count
+    attributes = equipment.attributes
+    columns = self.columns
+    columns["level"][row] = equipment.item_level
+    columns["slot"][row] = equipment.slot
+    columns["rarity"][row] = equipment.rarity
+    columns["enchant_count"][row] = equipment.enchant_count
+    columns["reforge_count"][row] = equipment.reforge_count
+    if "Type" in attributes:
+      columns["low"][row] = attributes["Low"]
+      columns["high"][row] = attributes["High"]
+      columns["weapon_type"][row] = WEAPON_TYPES.index(attributes["Type"])
+    else:
+      columns["low"][row] = 0
+      columns["high"][row] = 0
+      columns["weapon_type"][row] = -1
+    self.stats[row] = [attributes.get(stat, 0) for stat in STAT_COLUMNS]
+    self.count += 1
+    return row
+
+  def get(self, row):
+    """Rebuilds the Equipment stored in row, leaving it in the stash."""
+    if not 0 <= row < self.count:
+      raise IndexError("Stash row %d out of range" % row)
+    columns = self.columns
+    attributes = collections.defaultdict(int)
+    for stat, value in zip(STAT_COLUMNS, self.stats[row].tolist()):
+      if value or stat in DEFENSES:
+        attributes[stat] = value
+    if columns["weapon_type"][row] >= 0:
+      attributes["Low"] = int(columns["low"][row])
+      attributes["High"] = int(columns["high"][row])
+      attributes["Type"] = WEAPON_TYPES[columns["weapon_type"][row]]
+    equipment = Equipment(int(columns["level"][row]), attributes,
+                          int(columns["slot"][row]),
+                          int(columns["rarity"][row]))
+    equipment.enchant_count = int(columns["enchant_count"][row])
+    equipment.reforge_count = int(columns["reforge_count"][row])
+    return equipment
+
+  def take(self, row):
+    """Removes and returns the Equipment in row. The last row moves here."""
+    equipment = self.get(row)
+    last = self.count - 1
+    for column in self.columns.itervalues():
+      column[row] = column[last]
+    self.stats[row] = self.stats[last]
+    self.count -= 1
+    return equipment
+
+  def stat_column(self, stat):
+    return self.stats[:self.count, STAT_COLUMNS.index(stat)]
+
+  def find(self, slot=None, min_level=None, max_level=None, min_rarity=None,
+           weapon_type=None):
+    """Returns an array of the rows matching every given condition."""
+    mask = numpy.ones(self.count, dtype=bool)
+    columns = self.columns
+    if slot is not None:
+      if not isinstance(slot, int):
+        slot = SLOTS.index(slot)
+      mask &= columns["slot"][:self.count] == slot
+    if min_level is not None:
+      mask &= columns["level"][:self.count] >= min_level
+    if max_level is not None:
+      mask &= columns["level"][:self.count] <= max_level
+    if min_rarity is not None:
+      mask &= columns["rarity"][:self.count] >= min_rarity
+    if weapon_type is not None:
+      mask &= (columns["weapon_type"][:self.count] ==
+               WEAPON_TYPES.index(weapon_type))
+    return numpy.flatnonzero(mask)
+
+  def best(self, stat, **conditions):
+    """Row with the highest stat among the rows matching conditions (see
+    find), or None if nothing matches. stat may also be "Damage", the
+    average weapon damage."""
+    rows = self.find(**conditions)
+    if not rows.size:
+      return None
+    if stat == "Damage":
+      values = self.columns["low"][rows] + self.columns["high"][rows]
+    else:
+      values = self.stats[rows, STAT_COLUMNS.index(stat)]
+    return int(rows[numpy.argmax(values)])
+
+  def slot_counts(self):
+    counts = numpy.bincount(self.columns["slot"][:self.count],
+                            minlength=len(SLOTS))
+    return dict(zip(SLOTS, counts.tolist()))